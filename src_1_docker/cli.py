@@ -0,0 +1,282 @@
+"""Command-line entry point for the taxi ETL.
+
+    python cli.py run --zone yellow --year 2021 --month 1 --file-type csv.gz
+    python cli.py backfill --zone green --start 2024-01 --end 2024-06 --workers 3
+    python cli.py load-zones
+    python cli.py bench --url <file url>
+
+Only argparse and the side-effect-free config module are imported up front; each
+subcommand imports the pipeline modules it needs, so `--help` and light commands
+start without paying for pandas, pyarrow, sqlalchemy or a database connection.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+from config import PipelineConfig, ENV_FILE
+
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+BENCH_MODULES = ["config", "utils", "sinks", "etl_pipeline", "parquet_lake", "sketches", "od_matrix"]
+
+
+def parse_month(value: str) -> Tuple[int, int]:
+    """Parses 'YYYY-MM' into (year, month)."""
+
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got '{value}'")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"month out of range in '{value}'")
+    return year, month
+
+
+def iter_months(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Returns every (year, month) from start to end, both inclusive."""
+
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def build_config(args: argparse.Namespace) -> PipelineConfig:
+    """Resolves the run config from the environment and the command-line overrides."""
+
+    overrides = {}
+    if getattr(args, "chunk_size", None):
+        overrides["chunk_size"] = args.chunk_size
+    if getattr(args, "sinks", None):
+        overrides["sinks"] = [name.strip() for name in args.sinks.split(",") if name.strip()]
+    if getattr(args, "cache_dir", None):
+        overrides["source_cache_dir"] = args.cache_dir
+    if getattr(args, "rollup", None):
+        overrides["rollup_granularity"] = None if args.rollup == "none" else args.rollup
+    if getattr(args, "clustered", False):
+        overrides["clustered_loads"] = True
+    if getattr(args, "enrich_zones", False):
+        overrides["enrich_zones"] = True
+    if getattr(args, "no_quality_checks", False):
+        overrides["quality_checks"] = False
+    if getattr(args, "sketches", False):
+        overrides["build_sketches"] = True
+    if getattr(args, "od_matrices", False):
+        overrides["build_od_matrices"] = True
+
+    return PipelineConfig.from_env(args.env_file, **overrides)
+
+
+def run_file(url: str, zone: str, table_name: str, config: PipelineConfig) -> str:
+    """Runs the pipeline for one source file (also the unit of work of a backfill worker)."""
+
+    from etl_pipeline import etl_pipeline, get_file_type
+
+    etl_pipeline(url=url, zone=zone, table_name=table_name, file_type=get_file_type(url), config=config)
+    return url
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    from etl_pipeline import ensure_tables, get_source_url
+
+    config = build_config(args)
+    url = args.url or get_source_url(args.zone, args.year, args.month, args.file_type)
+    table_name = args.table or f"{args.zone}_taxi_data"
+
+    if "postgres" in config.sinks and not args.skip_table_check:
+        ensure_tables(config)
+
+    run_file(url, args.zone, table_name, config)
+    return 0
+
+
+def cmd_backfill(args: argparse.Namespace) -> int:
+    from etl_pipeline import ensure_tables, get_source_url
+
+    config = build_config(args)
+    table_name = args.table or f"{args.zone}_taxi_data"
+    urls = [get_source_url(args.zone, year, month, args.file_type) for year, month in iter_months(args.start, args.end)]
+
+    if args.workers > 1 and "duckdb" in config.sinks:
+        # A DuckDB file takes a single writer process
+        logger.error("The 'duckdb' sink cannot be used with --workers > 1.")
+        return 2
+
+    if "postgres" in config.sinks and not args.skip_table_check:
+        ensure_tables(config)
+
+    failed = {}
+    if args.workers > 1:
+        # Files are independent (their rollup, quarantine, lake, sketch and OD outputs are keyed by file),
+        # so months run in separate processes
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(run_file, url, args.zone, table_name, config): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[futures[future]] = e
+    else:
+        for url in urls:
+            try:
+                run_file(url, args.zone, table_name, config)
+            except Exception as e:
+                failed[url] = e
+
+    logger.info(f"Backfill finished: {len(urls) - len(failed)}/{len(urls)} files loaded")
+    for url, error in failed.items():
+        logger.error(f"Failed to load {url}: {error}")
+
+    return 1 if failed else 0
+
+
+def cmd_load_zones(args: argparse.Namespace) -> int:
+    import zone_enrichment
+    from one_time_load import zone_data_etl, zone_url
+
+    config = PipelineConfig.from_env(args.env_file)
+    url = args.url or zone_url
+
+    if not args.local_only:
+        zone_data_etl(url, config=config)
+
+    # Refresh the local copy used by zone enrichment and the data-quality rules
+    zone_enrichment.download_zone_file(url)
+    return 0
+
+
+def time_import(module: str) -> float:
+    """Seconds a fresh interpreter spends importing a module."""
+
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=script_dir, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def time_command(command: List[str]) -> float:
+    """Wall-clock seconds of a fresh process, interpreter start-up included."""
+
+    start = time.perf_counter()
+    subprocess.run(command, cwd=script_dir, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    print(f"Start-up (median of {args.repeat} fresh interpreters)")
+
+    for module in args.modules.split(","):
+        samples = [time_import(module) for _ in range(args.repeat)]
+        print(f"  import {module:<16} {statistics.median(samples) * 1000:8.1f} ms")
+
+    samples = [time_command([sys.executable, os.path.abspath(__file__), "--help"]) for _ in range(args.repeat)]
+    print(f"  {'cli.py --help':<23} {statistics.median(samples) * 1000:8.1f} ms (process wall time)")
+
+    if not args.url:
+        return 0
+
+    from etl_pipeline import (download_to_cache, extract_csv_chunks, extract_parquet_chunks, get_file_type,
+                              transform_data)
+
+    config = build_config(args)
+    extract = extract_parquet_chunks if get_file_type(args.url) == "parquet" else extract_csv_chunks
+    # Warm the source cache so the numbers exclude the download
+    download_to_cache(args.url, config.source_cache_dir)
+
+    # Chunk logging would dominate the timings
+    logging.getLogger("etl_pipeline").setLevel(logging.WARNING)
+
+    rows = 0
+    extract_secs = 0.0
+    transform_secs = 0.0
+    chunks = iter(extract(args.url, config.chunk_size, config.source_cache_dir))
+    while args.max_rows is None or rows < args.max_rows:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        extract_secs += time.perf_counter() - start
+        if chunk is None:
+            break
+
+        start = time.perf_counter()
+        transform_data(chunk, zone=args.zone, enrich_zones=config.enrich_zones)
+        transform_secs += time.perf_counter() - start
+        rows += len(chunk)
+
+    print(f"Pipeline throughput for {os.path.basename(args.url)} ({rows} rows, chunk size {config.chunk_size})")
+    for stage, secs in (("extract", extract_secs), ("transform", transform_secs)):
+        print(f"  {stage:<10} {secs:8.2f} s  {rows / secs if secs else 0:12,.0f} rows/s")
+
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="NYC taxi trip ETL")
+    parser.add_argument("--env-file", default=ENV_FILE, help="Path of the .env file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    settings = argparse.ArgumentParser(add_help=False)
+    settings.add_argument("--chunk-size", type=int, help="Rows per chunk")
+    settings.add_argument("--cache-dir", help="Directory holding downloaded sources")
+    settings.add_argument("--sinks", help="Comma-separated load targets: postgres, parquet, csv, duckdb")
+    settings.add_argument("--rollup", choices=["hour", "day", "none"], help="Rollup table granularity")
+    settings.add_argument("--clustered", action="store_true", help="Clustered Postgres loads with BRIN indexes")
+    settings.add_argument("--enrich-zones", action="store_true", help="Add pickup/dropoff borough and zone")
+    settings.add_argument("--no-quality-checks", action="store_true", help="Skip the data-quality gate")
+    settings.add_argument("--sketches", action="store_true", help="Persist quantile/distinct-count sketches")
+    settings.add_argument("--od-matrices", action="store_true", help="Persist origin-destination matrices")
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument("--zone", required=True, choices=["yellow", "green"])
+    source.add_argument("--file-type", default="parquet", choices=["parquet", "csv.gz"],
+                        help="Source format: TLC parquet or the DataTalksClub csv.gz mirror (2019-2021)")
+    source.add_argument("--table", help="Target table (default: {zone}_taxi_data)")
+    source.add_argument("--skip-table-check", action="store_true", help="Do not create missing Postgres tables")
+
+    run = subparsers.add_parser("run", parents=[settings, source], help="Load one month")
+    run.add_argument("--year", type=int, required=True)
+    run.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="MONTH")
+    run.add_argument("--url", help="Load this file instead of the zone/year/month source")
+    run.set_defaults(handler=cmd_run)
+
+    backfill = subparsers.add_parser("backfill", parents=[settings, source], help="Load a range of months")
+    backfill.add_argument("--start", type=parse_month, required=True, help="First month, YYYY-MM")
+    backfill.add_argument("--end", type=parse_month, required=True, help="Last month (inclusive), YYYY-MM")
+    backfill.add_argument("--workers", type=int, default=1, help="Months loaded in parallel processes")
+    backfill.set_defaults(handler=cmd_backfill)
+
+    load_zones = subparsers.add_parser("load-zones", help="Load the taxi zone lookup table")
+    load_zones.add_argument("--url", help="Zone lookup CSV (default: TLC taxi_zone_lookup.csv)")
+    load_zones.add_argument("--local-only", action="store_true",
+                            help="Only refresh the local copy used for zone enrichment")
+    load_zones.set_defaults(handler=cmd_load_zones)
+
+    bench = subparsers.add_parser("bench", parents=[settings], help="Measure start-up and pipeline throughput")
+    bench.add_argument("--modules", default=",".join(BENCH_MODULES), help="Comma-separated modules to time")
+    bench.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    bench.add_argument("--url", help="Also time extract/transform of this file (no sinks)")
+    bench.add_argument("--zone", default="yellow", choices=["yellow", "green"])
+    bench.add_argument("--max-rows", type=int, help="Stop the throughput run after this many rows")
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
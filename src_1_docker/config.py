@@ -0,0 +1,116 @@
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+ENV_FILE = os.path.join(parent_dir, ".env")
+DATA_DIR = os.path.join(parent_dir, "data")
+
+CHUNK_SIZE = 10000
+
+# Downloaded sources are spooled here and read memory-mapped
+SOURCE_CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# Engines are shared per URI and created on first use, never at import
+_engines: Dict[str, Any] = {}
+
+
+@dataclass
+class PipelineConfig:
+    """Settings of an ETL run.
+
+    Building a config has no side effects; ``from_env`` reads the .env file and
+    environment, and database resources are only created when first requested.
+    """
+
+    chunk_size: int = CHUNK_SIZE
+
+    # Load targets: any of 'postgres' (COPY), 'parquet' (Hive-partitioned lake under lake_root; spools and
+    # quarantined rows go to the sibling '{lake_root}_staging' and '{lake_root}_quarantine' directories),
+    # 'csv' (files under csv_output_dir, e.g. for GCS/BigQuery) and 'duckdb' (duckdb_path)
+    sinks: List[str] = field(default_factory=lambda: ['postgres'])
+    source_cache_dir: str = SOURCE_CACHE_DIR
+    lake_root: str = os.path.join(DATA_DIR, "lake")
+    csv_output_dir: str = os.path.join(DATA_DIR, "csv")
+    duckdb_path: str = os.path.join(DATA_DIR, "nyc_taxi.duckdb")
+
+    # Sort Postgres load batches by pickup time and maintain BRIN/B-tree indexes after the load
+    clustered_loads: bool = False
+
+    # Persist mergeable quantile/distinct-count sketches per source file (see sketches.merge_sketches)
+    build_sketches: bool = False
+
+    # Persist hour-of-day x pickup x dropoff zone matrices per source file (see od_matrix.load_od_matrix)
+    build_od_matrices: bool = False
+
+    # Zone enrichment (pickup/dropoff borough and zone) from the cached taxi_zone_lookup
+    enrich_zones: bool = False
+
+    # Route rows failing the data-quality rules to '{table}_quarantine' instead of the trip table
+    quality_checks: bool = True
+
+    # Maintain '{zone}_taxi_rollup_{granularity}' alongside Postgres loads ('hour', 'day' or None)
+    rollup_granularity: Optional[str] = 'hour'
+
+    # Database configuration
+    db_uri: Optional[str] = None
+    db_host: str = 'localhost'
+    db_name: str = 'nyc_taxi'
+    db_user: Optional[str] = None
+    db_password: Optional[str] = None
+    db_port: int = 5432
+
+    @classmethod
+    def from_env(cls, env_file: str = ENV_FILE, **overrides) -> "PipelineConfig":
+        """
+        Build a config from the .env file and the process environment.
+
+        Args:
+            env_file: Path of the .env file (missing files are ignored)
+            overrides: Field values taking precedence over the environment
+
+        Returns:
+            The resolved config
+        """
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file)
+
+        settings = {
+            'source_cache_dir': os.getenv("SOURCE_CACHE_DIR", SOURCE_CACHE_DIR),
+            'db_uri': os.getenv("POSTGRES_ENGINE_URI"),
+            'db_host': os.getenv("POSTGRES_HOST", 'localhost'),
+            'db_user': os.getenv("POSTGRES_USER"),
+            'db_password': os.getenv("POSTGRES_PASSWORD"),
+            'db_port': int(os.getenv("POSTGRES_PORT", 5432)),
+        }
+        settings.update(overrides)
+
+        return cls(**settings)
+
+    @property
+    def db_config(self) -> Dict[str, Any]:
+        """Connection parameters in the form the psycopg2 helpers in utils expect."""
+
+        return {
+            'host': self.db_host,
+            'database': self.db_name,
+            'user': self.db_user,
+            'password': self.db_password,
+            'port': self.db_port,
+        }
+
+    def get_engine(self):
+        """Returns the SQLAlchemy engine for ``db_uri``, creating it on first use."""
+
+        if not self.db_uri:
+            raise ValueError("POSTGRES_ENGINE_URI is not set.")
+
+        if self.db_uri not in _engines:
+            from sqlalchemy import create_engine
+
+            _engines[self.db_uri] = create_engine(self.db_uri)
+
+        return _engines[self.db_uri]
@@ -0,0 +1,188 @@
+import io
+import os
+import mmap
+import queue
+import struct
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Prefer ISA-L, then zlib-ng, over the stdlib zlib; all three release the GIL while inflating
+try:
+    from isal import igzip as gzip_backend, isal_zlib as zlib_backend
+    BACKEND = "isal"
+except ImportError:
+    try:
+        from zlib_ng import gzip_ng as gzip_backend, zlib_ng as zlib_backend
+        BACKEND = "zlib-ng"
+    except ImportError:
+        import gzip as gzip_backend
+        import zlib as zlib_backend
+        BACKEND = "zlib"
+
+
+BLOCK_SIZE = 4 * 1024 * 1024
+QUEUE_BLOCKS = 8
+DECOMPRESS_THREADS = min(4, os.cpu_count() or 1)
+
+GZIP_WBITS = 31
+FEXTRA = 0x04
+
+_END = object()
+
+
+def bgzf_members(buffer) -> Optional[List[Tuple[int, int]]]:
+    """
+    Return the (start, end) offsets of every member of a BGZF-style multi-member gzip.
+
+    BGZF (bgzip) members record their compressed size in a 'BC' extra subfield, so
+    the file can be split without inflating it. Returns None for any other gzip.
+    """
+    members = []
+    offset = 0
+    size = len(buffer)
+
+    while offset < size:
+        header = buffer[offset:offset + 12]
+        if len(header) < 12 or header[:2] != b"\x1f\x8b" or not header[3] & FEXTRA:
+            return None
+
+        xlen = struct.unpack("<H", header[10:12])[0]
+        extra = buffer[offset + 12:offset + 12 + xlen]
+        block_size = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            subfield_id, subfield_len = extra[pos:pos + 2], struct.unpack("<H", extra[pos + 2:pos + 4])[0]
+            if subfield_id == b"BC" and subfield_len == 2:
+                block_size = struct.unpack("<H", extra[pos + 4:pos + 6])[0] + 1
+            pos += 4 + subfield_len
+
+        if block_size is None:
+            return None
+
+        members.append((offset, offset + block_size))
+        offset += block_size
+
+    return members
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """Binary stream of decompressed gzip data produced on background threads.
+
+    A producer thread inflates the source into blocks and hands them to the reader
+    through a bounded queue, so the parser never waits on decompression unless it
+    outpaces it, and memory stays at ``QUEUE_BLOCKS`` blocks. BGZF multi-member
+    input held in a sliceable buffer (bytes, mmap) is inflated member-parallel.
+    """
+
+    def __init__(self, source, threads: int = DECOMPRESS_THREADS, queue_blocks: int = QUEUE_BLOCKS):
+        super().__init__()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_blocks)
+        self._stop = threading.Event()
+        self._pending = memoryview(b"")
+        self._eof = False
+
+        members = bgzf_members(source) if isinstance(source, (bytes, bytearray, mmap.mmap)) else None
+        if members and threads > 1:
+            logger.info(f"Inflating {len(members)} BGZF members on {threads} threads ({BACKEND})")
+            blocks = self._parallel_blocks(source, members, threads, queue_blocks)
+        else:
+            fileobj = source if hasattr(source, "read") else io.BytesIO(source)
+            blocks = self._stream_blocks(fileobj)
+
+        self._producer = threading.Thread(target=self._produce, args=(blocks,), daemon=True)
+        self._producer.start()
+
+    @staticmethod
+    def _stream_blocks(fileobj: BinaryIO) -> Iterator[bytes]:
+        with gzip_backend.GzipFile(fileobj=fileobj) as decompressed:
+            while True:
+                block = decompressed.read(BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+
+    @staticmethod
+    def _parallel_blocks(buffer, members: List[Tuple[int, int]], threads: int, window: int) -> Iterator[bytes]:
+        # Keep at most `window` members in flight and yield them in file order
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            in_flight = deque()
+            for start, end in members:
+                in_flight.append(executor.submit(zlib_backend.decompress, buffer[start:end], GZIP_WBITS))
+                if len(in_flight) >= window:
+                    yield in_flight.popleft().result()
+            for future in in_flight:
+                yield future.result()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, blocks: Iterator[bytes]):
+        try:
+            for block in blocks:
+                if block and not self._put(block):
+                    return
+            self._put(_END)
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not len(self._pending):
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is _END:
+                self._eof = True
+                return 0
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            self._pending = memoryview(item)
+
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            # Unblock a producer waiting on a full queue
+            while not self._queue.empty():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._producer.join()
+            self._pending = memoryview(b"")
+        super().close()
+
+
+def open_gzip(source, threads: int = DECOMPRESS_THREADS) -> io.BufferedReader:
+    """
+    Open gzip data for reading with decompression off the parsing thread.
+
+    Args:
+        source: Compressed bytes/mmap (enables BGZF member-parallel inflate) or a binary file object
+        threads: Worker threads for multi-member input
+
+    Returns:
+        A buffered binary stream of the decompressed data
+    """
+    return io.BufferedReader(ThreadedDecompressor(source, threads=threads), buffer_size=BLOCK_SIZE)
@@ -1,28 +1,26 @@
 import pandas as pd
-import requests
-from io import StringIO, BytesIO
-from typing import Iterator, Dict, Any
+import mmap
+import contextlib
+from typing import Iterator, List, Optional
 import logging
-import gzip
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect
 import os
 import utils as utils
-import pyarrow.parquet as pq
-from one_time_load import zone_data_etl
+import zone_enrichment
+import decompression
+from config import PipelineConfig, CHUNK_SIZE, SOURCE_CACHE_DIR
+from quality_gate import QualityGate, get_file_period
+from sinks import Sink, SinkFanOut, PostgresCopySink, CsvFileSink
 
+# requests, pyarrow, sqlalchemy, duckdb and the lake/sketch/OD-matrix sinks are imported
+# where they are used, so importing this module stays cheap and free of side effects
 
-parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-env_file = os.path.join(parent_dir, ".env")
-
-load_dotenv(os.path.join(env_file))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configuration
-CHUNK_SIZE = 10000
+# Configuration (run settings live in config.PipelineConfig)
+DOWNLOAD_BLOCK_SIZE = 8 * 1024 * 1024
 
 DTYPE_INT_COLS = [
     "VendorID",
@@ -45,18 +43,15 @@ DTYPE_FLOAT_COLS = [
     "congestion_surcharge",
 ]
 
-# Database configuration
-DB_URI = os.getenv("POSTGRES_ENGINE_URI")
-engine = create_engine(DB_URI)
+# Larger Postgres batches for clustered loads give tighter block ranges per BRIN summary
+CLUSTERED_BUFFER_ROWS = 500_000
 
+# Rollup configuration: pandas floor frequency per supported bucket granularity
+ROLLUP_FREQUENCIES = {'hour': 'h', 'day': 'D'}
+ROLLUP_KEY_COLS = ["source_file", "bucket_start", "pickup_location_id", "payment_type"]
 
-DB_CONFIG = {
-    'host': 'localhost',
-    'database': 'nyc_taxi',
-    'user': os.getenv("POSTGRES_USER"),
-    'password': os.getenv("POSTGRES_PASSWORD"),
-    'port': 5432
-}
+PARQUET_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/"
+CSV_URL = "https://github.com/DataTalksClub/nyc-tlc-data/releases/download/"
 
 
 def get_tripdata_url(zone: str = 'yellow', year: int = 2025, month: int = 11) -> str:
@@ -98,46 +93,115 @@ def get_tripdata_url(zone: str = 'yellow', year: int = 2025, month: int = 11) ->
     return url
 
 
-def extract_parquet_chunks(url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+def get_source_url(zone: str, year: int, month: int, file_type: str = 'parquet') -> str:
+    """Constructs the URL of a monthly trip data file.
+    Args:
+        zone (str): The zone of the trip data ('yellow' or 'green').
+        year (int): The year of the trip data.
+        month (int): The month of the trip data.
+        file_type (str): 'parquet' (TLC CloudFront) or 'csv.gz' (DataTalksClub mirror, 2019-2021).
+    Returns:
+        str: The constructed URL for the trip data file.
+    """
+    if zone not in ('yellow', 'green'):
+        raise ValueError("zone must be either 'yellow' or 'green'.")
+
+    file_name = f"{zone}_tripdata_{year}-{month:02d}"
+
+    if file_type == 'parquet':
+        return f"{PARQUET_URL}{file_name}.parquet"
+    elif file_type == 'csv.gz':
+        return f"{CSV_URL}{zone}/{file_name}.csv.gz"
+    else:
+        raise ValueError("file_type must be either 'parquet' or 'csv.gz'.")
+
+
+def get_file_type(url: str) -> str:
+    """Infers the etl_pipeline file_type of a source URL."""
+
+    return 'parquet' if url.endswith('.parquet') else 'csv'
+
+
+def download_to_cache(url: str, cache_dir: str = SOURCE_CACHE_DIR) -> str:
+    """
+    Stream a source file to the local cache and return its path.
+
+    The download goes to a process-unique temp file that is renamed into place, so
+    the cache only ever holds complete files and concurrent workers can share them.
+
+    Args:
+        url: URL of the source file
+        cache_dir: Directory holding downloaded sources
+
+    Returns:
+        Local path of the cached file
+    """
+    import requests
+
+    file_path = os.path.join(cache_dir, os.path.basename(url))
+    if os.path.exists(file_path):
+        logger.info(f"Using cached source {file_path}")
+        return file_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+
+    logger.info(f"Downloading {url} to {file_path}")
+    try:
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for block in response.iter_content(chunk_size=DOWNLOAD_BLOCK_SIZE):
+                    f.write(block)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return file_path
+
+
+def extract_parquet_chunks(url: str, chunk_size: int = CHUNK_SIZE,
+                           cache_dir: str = SOURCE_CACHE_DIR) -> Iterator[pd.DataFrame]:
     """
     Extract Parquet data from URL in chunks.
+
+    The file is spooled to the source cache and read memory-mapped one batch at a
+    time, so only the current chunk is resident in process memory.
     
     Args:
         url: URL of the Parquet file
         chunk_size: Number of rows per chunk
+        cache_dir: Directory holding downloaded sources
         
     Yields:
         DataFrame chunks
     """
+    import requests
+    import pyarrow.parquet as pq
+
     logger.info(f"Starting Parquet extraction from {url}")
     
     try:
-        # Download the Parquet file
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Load into BytesIO
-        parquet_file = BytesIO(response.content)
+        file_path = download_to_cache(url, cache_dir)
         
         # Read Parquet file
-        parquet_table = pq.read_table(parquet_file)
+        parquet_file = pq.ParquetFile(file_path, memory_map=True)
         
         # Get total number of rows
-        total_rows = parquet_table.num_rows
+        total_rows = parquet_file.metadata.num_rows
         logger.info(f"Total rows in Parquet file: {total_rows}")
         
         # Process in chunks
         chunk_count = 0
-        for i in range(0, total_rows, chunk_size):
-            # Extract chunk
-            end_idx = min(i + chunk_size, total_rows)
-            chunk_table = parquet_table.slice(i, end_idx - i)
-            
+        rows_read = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
             # Convert to pandas DataFrame
-            chunk = chunk_table.to_pandas()
+            chunk = batch.to_pandas()
             
             chunk_count += 1
-            logger.info(f"Extracted chunk {chunk_count} with {len(chunk)} rows (rows {i} to {end_idx-1})")
+            logger.info(f"Extracted chunk {chunk_count} with {len(chunk)} rows (rows {rows_read} to {rows_read + len(chunk) - 1})")
+            rows_read += len(chunk)
             yield chunk
             
     except requests.RequestException as e:
@@ -148,56 +212,57 @@ def extract_parquet_chunks(url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[p
         raise
 
 
-def extract_csv_chunks(url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+def extract_csv_chunks(url: str, chunk_size: int = CHUNK_SIZE,
+                       cache_dir: str = SOURCE_CACHE_DIR) -> Iterator[pd.DataFrame]:
     """
     Extract CSV data from URL in chunks.
     Handles both plain CSV and gzipped CSV files.
+
+    The file is spooled to the source cache and parsed from a read-only mmap, so
+    the OS page cache holds the bytes and workers reading the same file share them.
     
     Args:
         url: URL of the CSV file (can be .csv or .csv.gz)
         chunk_size: Number of rows per chunk
+        cache_dir: Directory holding downloaded sources
         
     Yields:
         DataFrame chunks
     """
+    import requests
+
     logger.info(f"Starting CSV extraction from {url}")
     
     try:
-        # Download the file
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        file_path = download_to_cache(url, cache_dir)
         
         # Check if file is gzipped based on URL or content
         is_gzipped = url.endswith('.gz')
         
-        if is_gzipped:
-            logger.info("Detected gzipped file, decompressing...")
-            # Decompress gzipped content
-            compressed_file = BytesIO(response.content)
-            decompressed_file = gzip.GzipFile(fileobj=compressed_file)
-            
-            # Read CSV in chunks from decompressed data
-            chunk_iterator = pd.read_csv(
-                decompressed_file,
-                chunksize=chunk_size,
-                encoding='utf-8',
-                on_bad_lines='skip',
-            )
-        else:
-            # Read plain CSV
-            csv_data = StringIO(response.text, newline='')
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                contextlib.ExitStack() as stack:
+            if is_gzipped:
+                logger.info(f"Detected gzipped file, decompressing with {decompression.BACKEND}...")
+                # Inflate on background threads so parsing overlaps decompression;
+                # closed before the mmap because the producer reads from it
+                source = stack.enter_context(decompression.open_gzip(mapped))
+            else:
+                source = mapped
+
+            # Read CSV in chunks from the mapped data
             chunk_iterator = pd.read_csv(
-                csv_data,
+                source,
                 chunksize=chunk_size,
                 encoding='utf-8',
                 on_bad_lines='skip',
             )
-        
-        chunk_count = 0
-        for chunk in chunk_iterator:
-            chunk_count += 1
-            logger.info(f"Extracted chunk {chunk_count} with {len(chunk)} rows")
-            yield chunk
+            
+            chunk_count = 0
+            with chunk_iterator:
+                for chunk in chunk_iterator:
+                    chunk_count += 1
+                    logger.info(f"Extracted chunk {chunk_count} with {len(chunk)} rows")
+                    yield chunk
             
     except requests.RequestException as e:
         logger.error(f"Failed to fetch CSV from URL: {e}")
@@ -210,18 +275,27 @@ def extract_csv_chunks(url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.Da
         raise
 
 
-def transform_data(df: pd.DataFrame, zone: str) -> pd.DataFrame:
+def transform_data(df: pd.DataFrame, zone: str, enrich_zones: bool = False,
+                   quality_gate: Optional[QualityGate] = None) -> pd.DataFrame:
     """Transforms the input DataFrame by renaming columns and calculating trip duration.
     Args:
         df (pd.DataFrame): The input DataFrame containing trip data.
         zone (str): The zone of the taxi trip data ('yellow' or 'green').
+        enrich_zones (bool): Add pickup/dropoff borough and zone from the cached zone lookup.
+        quality_gate (QualityGate): Drop rows failing the data-quality rules, buffering them for quarantine.
     Returns:
         pd.DataFrame: The transformed DataFrame with renamed columns and trip duration.
     """
     logger.info(f"Transforming chunk with {len(df)} rows")
 
+    if quality_gate is not None:
+        raw_notna = quality_gate.snapshot(df, get_date_cols(zone) + DTYPE_INT_COLS + DTYPE_FLOAT_COLS)
+
     df = normalize_schema(df, zone=zone)
 
+    if quality_gate is not None:
+        coerced = quality_gate.coerced_mask(df, raw_notna)
+
     if zone=='yellow':
         df.rename(columns={
                 'VendorID': 'vendor_id',
@@ -246,22 +320,33 @@ def transform_data(df: pd.DataFrame, zone: str) -> pd.DataFrame:
             }, inplace=True)
 
     df['trip_duration_secs'] = df[['dropoff_datetime','pickup_datetime']].apply(lambda x: (x['dropoff_datetime']-x['pickup_datetime']).seconds, axis=1)
+    # NaT timestamps turn the durations into floats, which COPY rejects for the INTEGER column
+    df['trip_duration_secs'] = df['trip_duration_secs'].astype('Int64')
+
+    if quality_gate is not None:
+        df = quality_gate.apply(df, coerced)
 
+    if enrich_zones:
+        df = zone_enrichment.enrich_zones(df)
 
     logger.info(f"Transformation complete - {len(df)} rows processed")
 
     return df
 
 
-def normalize_schema(df: pd.DataFrame, zone: str) -> pd.DataFrame:
-    """Normalize data types and parse date fields after extraction."""
-    
+def get_date_cols(zone: str) -> list:
+    """Returns the raw pickup/dropoff timestamp columns of a zone's files."""
+
     if zone == "yellow":
-        date_cols = ["tpep_pickup_datetime", "tpep_dropoff_datetime"]
+        return ["tpep_pickup_datetime", "tpep_dropoff_datetime"]
     else:
-        date_cols = ["lpep_pickup_datetime", "lpep_dropoff_datetime"]
+        return ["lpep_pickup_datetime", "lpep_dropoff_datetime"]
+
 
-    for col in date_cols:
+def normalize_schema(df: pd.DataFrame, zone: str) -> pd.DataFrame:
+    """Normalize data types and parse date fields after extraction."""
+
+    for col in get_date_cols(zone):
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors="coerce")
 
@@ -279,58 +364,293 @@ def normalize_schema(df: pd.DataFrame, zone: str) -> pd.DataFrame:
     return df
 
 
-def etl_pipeline(url: str, zone: str, db_config: Dict[str, Any], table_name: str, chunk_size: int = CHUNK_SIZE, file_type: str = 'csv'):
+def aggregate_rollup(df: pd.DataFrame, granularity: str, source_file: str) -> pd.DataFrame:
+    """Computes the partial rollup aggregates of a transformed chunk.
+    Args:
+        df (pd.DataFrame): The transformed trip chunk.
+        granularity (str): The time bucket size ('hour' or 'day').
+        source_file (str): The file the chunk was extracted from.
+    Returns:
+        pd.DataFrame: One row per bucket x pickup zone x payment type with trip counts and sums.
+    """
+    if granularity not in ROLLUP_FREQUENCIES:
+        raise ValueError(f"granularity must be one of {list(ROLLUP_FREQUENCIES)}.")
+
+    # Rows without a pickup time cannot be bucketed; missing zone/payment codes map to -1
+    df = df[df['pickup_datetime'].notna()]
+
+    rollup = df.assign(
+        bucket_start=df['pickup_datetime'].dt.floor(ROLLUP_FREQUENCIES[granularity]),
+        pickup_location_id=df['pickup_location_id'].fillna(-1),
+        payment_type=df['payment_type'].fillna(-1),
+    ).groupby(ROLLUP_KEY_COLS[1:], sort=False).agg(
+        trip_count=('bucket_start', 'size'),
+        fare_amount_sum=('fare_amount', 'sum'),
+        tip_amount_sum=('tip_amount', 'sum'),
+        trip_distance_miles_sum=('trip_distance_miles', 'sum'),
+    ).reset_index()
+
+    rollup.insert(0, 'source_file', source_file)
+
+    return rollup
+
+
+def get_rollup_writer(rollup_table: str, granularity: str, source_file: str):
+    """Returns a PostgresCopySink on_batch hook that upserts the rollup of each loaded batch.
+
+    The upsert runs in the load transaction, so the rollup commits or rolls back
+    together with the trip rows it aggregates.
+    """
+    def upsert_batch_rollup(cursor, df: pd.DataFrame):
+        rollup = aggregate_rollup(df, granularity, source_file)
+        utils.upsert_rollup_rows(cursor, rollup, rollup_table, ROLLUP_KEY_COLS)
+
+    return upsert_batch_rollup
+
+
+def get_reload_cleaner(table_name: str, period: Optional[pd.Period], rollup_table: Optional[str],
+                       source_file: str):
+    """Returns a PostgresCopySink on_begin hook that removes what a previous load of the file wrote.
+
+    The month's trips and the file's rollup rows are deleted in the load transaction,
+    so a failed reload leaves the previous load intact and a successful one replaces
+    it. Trips are matched by pickup month, which is exactly the file's rows when the
+    quality gate quarantines rows outside the file month.
+    """
+    if period is None:
+        logger.warning(f"Cannot derive the month of '{source_file}'; its previous trip rows are not replaced")
+
+    def delete_previous_load(cursor):
+        if period is not None:
+            utils.clear_pickup_range_rows(cursor, table_name, period.start_time, (period + 1).start_time)
+        if rollup_table:
+            utils.clear_source_file_rows(cursor, rollup_table, source_file)
+
+    return delete_previous_load
+
+
+def build_sinks(config: PipelineConfig, zone: str, table_name: str, source_file: str,
+                period: Optional[pd.Period], on_postgres_batch=None, on_postgres_begin=None) -> List[Sink]:
+    """Constructs the sinks a run fans its transformed chunks out to.
+    Args:
+        config (PipelineConfig): Run settings; config.sinks holds any of 'postgres', 'parquet', 'csv' and 'duckdb'.
+        zone (str): The zone of the trip data ('yellow' or 'green').
+        table_name (str): Target Postgres/DuckDB table name.
+        source_file (str): Name of the file being processed.
+        period (pd.Period): Month the file covers, required for the 'parquet' partition.
+        on_postgres_batch: Hook run in the Postgres load transaction after each copied batch (see get_rollup_writer).
+        on_postgres_begin: Hook run once at the start of the Postgres load transaction (see get_reload_cleaner).
+    Returns:
+        List[Sink]: One sink per requested name, plus the sketch/OD-matrix sinks when enabled.
+    """
+    sinks = []
+
+    for name in config.sinks:
+        if name == 'postgres':
+            if config.clustered_loads:
+                sinks.append(PostgresCopySink(config.db_config, table_name, buffer_rows=CLUSTERED_BUFFER_ROWS,
+                                              sort_by='pickup_datetime', on_batch=on_postgres_batch,
+                                              on_begin=on_postgres_begin))
+            else:
+                sinks.append(PostgresCopySink(config.db_config, table_name, on_batch=on_postgres_batch,
+                                              on_begin=on_postgres_begin))
+        elif name == 'parquet':
+            from parquet_lake import ParquetLakeSink
+
+            if period is None:
+                raise ValueError(f"Cannot derive the year/month partition from '{source_file}'.")
+            sinks.append(ParquetLakeSink(config.lake_root, zone, period.year, period.month))
+        elif name == 'csv':
+            file_stem = source_file.split('.')[0]
+            sinks.append(CsvFileSink(os.path.join(config.csv_output_dir, f"{file_stem}_transformed.csv")))
+        elif name == 'duckdb':
+            from sinks import DuckDBSink
+
+            sinks.append(DuckDBSink(config.duckdb_path, table_name))
+        else:
+            raise ValueError(f"Unknown sink '{name}'. Expected one of 'postgres', 'parquet', 'csv' or 'duckdb'.")
+
+    if config.build_sketches:
+        from sketches import SketchSink, get_sketch_path
+
+        sinks.append(SketchSink(get_sketch_path(zone, source_file)))
+
+    if config.build_od_matrices:
+        from od_matrix import ODMatrixSink, get_od_matrix_dir
+
+        sinks.append(ODMatrixSink(get_od_matrix_dir(zone, source_file)))
+
+    return sinks
+
+
+def build_quarantine_sink(config: PipelineConfig, zone: str, table_name: str, source_file: str,
+                          period: Optional[pd.Period]) -> Sink:
+    """Picks where quarantined rows go: the Postgres quarantine table, the lake, or a CSV file."""
+
+    if 'postgres' in config.sinks:
+        quarantine_table = f"{table_name}_quarantine"
+
+        # The file's previous quarantine rows are replaced in the same transaction as the new ones
+        def clear_previous_rows(cursor):
+            utils.clear_source_file_rows(cursor, quarantine_table, source_file)
+
+        return PostgresCopySink(config.db_config, quarantine_table, on_begin=clear_previous_rows)
+    if 'parquet' in config.sinks and period is not None:
+        from parquet_lake import ParquetLakeSink, get_quarantine_root
+
+        return ParquetLakeSink(get_quarantine_root(config.lake_root), zone, period.year, period.month)
+
+    file_stem = source_file.split('.')[0]
+    return CsvFileSink(os.path.join(config.csv_output_dir, f"{file_stem}_quarantine.csv"))
+
+
+def etl_pipeline(url: str, zone: str, table_name: str, file_type: str = 'csv',
+                 config: Optional[PipelineConfig] = None):
     """
     Execute the complete ETL pipeline.
+
+    The file is extracted and transformed once; every transformed chunk is fanned
+    out to all configured sinks. A failing sink is dropped without stopping the others.
     
     Args:
         url: File URL (CSV, CSV.GZ, or Parquet)
         zone: The zone of the trip data ('yellow' or 'green')
-        db_config: Database configuration
         table_name: Target table name
-        chunk_size: Number of rows per chunk
         file_type: Type of file - 'csv', 'csv.gz', or 'parquet'
+        config: Run settings (chunk size, sinks, rollups, quality checks, database, ...); defaults to
+            PipelineConfig.from_env()
     """
     logger.info(f"Starting ETL pipeline for {file_type} file")
+
+    if config is None:
+        config = PipelineConfig.from_env()
     
     total_rows = 0
     chunk_num = 0
+    db_config = config.db_config
+    source_file = os.path.basename(url)
+    period = get_file_period(url)
+    use_postgres = 'postgres' in config.sinks
+    rollup_granularity = config.rollup_granularity
+    rollup_table = f"{zone}_taxi_rollup_{rollup_granularity}" if rollup_granularity and use_postgres else None
+    quality_gate = QualityGate(period=period) if config.quality_checks else None
+    fan_out = None
+    quarantine_sink = None
     
     try:
+        if use_postgres and config.enrich_zones:
+            utils.execute_sql(db_config, utils.get_zone_columns_sql(table_name))
+
+        if config.quality_checks:
+            if use_postgres:
+                quarantine_table = f"{table_name}_quarantine"
+                utils.execute_sql(db_config, utils.get_quarantine_schema(table_name))
+                if config.enrich_zones:
+                    utils.execute_sql(db_config, utils.get_zone_columns_sql(quarantine_table))
+            quarantine_sink = build_quarantine_sink(config, zone, table_name, source_file, period)
+
+        rollup_writer = None
+        if rollup_table:
+            utils.create_table_if_not_exists(db_config, rollup_table, utils.get_rollup_schema(rollup_table))
+            rollup_writer = get_rollup_writer(rollup_table, rollup_granularity, source_file)
+
+        # A reloaded month replaces its previous trips and rollup rows instead of adding to them
+        reload_cleaner = get_reload_cleaner(table_name, period, rollup_table, source_file) if use_postgres else None
+
+        fan_out = SinkFanOut(build_sinks(config, zone, table_name, source_file, period,
+                                         on_postgres_batch=rollup_writer, on_postgres_begin=reload_cleaner))
+
         # Determine extraction method based on file type
         if file_type == 'parquet':
-            chunk_iterator = extract_parquet_chunks(url, chunk_size)
+            chunk_iterator = extract_parquet_chunks(url, config.chunk_size, config.source_cache_dir)
         else:
             # Works for both 'csv' and 'csv.gz'
-            chunk_iterator = extract_csv_chunks(url, chunk_size)
+            chunk_iterator = extract_csv_chunks(url, config.chunk_size, config.source_cache_dir)
         
         # Process each chunk
         for chunk in chunk_iterator:
             chunk_num += 1
             
             # Transform
-            transformed_chunk = transform_data(chunk, zone=zone)
+            transformed_chunk = transform_data(chunk, zone=zone, enrich_zones=config.enrich_zones,
+                                               quality_gate=quality_gate)
             
             # Load
-            utils.load_to_postgres(transformed_chunk, db_config, table_name)
+            fan_out.write(transformed_chunk)
+
+            if quality_gate is not None:
+                rejected = quality_gate.drain()
+                if len(rejected):
+                    rejected.insert(0, 'source_file', source_file)
+                    quarantine_sink.write(rejected)
             
             total_rows += len(transformed_chunk)
             logger.info(f"Processed chunk {chunk_num}. Total rows processed: {total_rows}")
-        
-        logger.info(f"ETL pipeline completed successfully. Total rows: {total_rows}")
+
+        written = fan_out.close()
+        # After a failed load the quarantine is aborted below with the rest, keeping the previous run's rows
+        if quarantine_sink is not None and not fan_out.failed_destinations:
+            quarantine_sink.close()
+
+        if config.clustered_loads and 'postgres' in written:
+            utils.execute_sql(db_config, utils.get_cluster_indexes_sql(table_name))
+            utils.execute_sql(db_config, utils.get_index_maintenance_sql(table_name))
+            logger.info(f"Indexes on '{table_name}' created/summarized")
+
+        if fan_out.failed:
+            logger.warning(f"Sinks dropped during the run: {list(fan_out.failed)}")
+        if fan_out.failed_destinations:
+            # The healthy sinks have committed; the run still fails so callers do not count the file as loaded
+            raise RuntimeError(f"Destinations failed for {source_file}: {fan_out.failed_destinations}")
+        logger.info(f"ETL pipeline completed successfully. Total rows: {total_rows}. Rows per sink: {written}")
+
+        if quality_gate is not None:
+            logger.info(f"Data-quality summary for {source_file}: {quality_gate.summary()}")
         
     except Exception as e:
         logger.error(f"ETL pipeline failed: {e}")
+        for partial_sink in (fan_out, quarantine_sink):
+            if partial_sink is not None:
+                partial_sink.abort()
         raise
 
 
-def main():
+def ensure_tables(config: PipelineConfig):
+    """Creates the zone lookup and trip tables that do not exist yet."""
+
+    from sqlalchemy import inspect
+    from one_time_load import zone_data_etl
+
+    inspector = inspect(config.get_engine())
+
+    if inspector.has_table("taxi_zone_lookup"):
+        logger.info("Zone-Lookup table already exists. Skipping load.")
+    else:
+        zone_data_etl(config=config)
+
+    if inspector.has_table("yellow_taxi_data"):
+        logger.info("Yellow-Zone table already exists. Skipping table creation.")
+    else:
+        utils.create_table_if_not_exists(config.db_config, "yellow_taxi_data", utils.get_yellow_trip_schema())
+
+    if inspector.has_table("green_taxi_data"):
+        logger.info("Green-Zone table already exists. Skipping table creation.")
+    else:
+        utils.create_table_if_not_exists(config.db_config, "green_taxi_data", utils.get_green_trip_schema())
+
+
+def main(config: Optional[PipelineConfig] = None):
+
+    if config is None:
+        config = PipelineConfig.from_env()
 
     files = [
         {'zone': 'yellow', 'year': 2021, 'month': 1, 'file_type': 'csv'},
         {'zone': 'green', 'year': 2025, 'month': 11, 'file_type': 'parquet'},
     ]   
 
+    ensure_tables(config)
+
     for file in files:
         zone = file['zone']
         year = file['year']
@@ -343,36 +663,12 @@ def main():
         etl_pipeline(
             url=tripdata_url,
             zone=zone,
-            db_config=DB_CONFIG,
             table_name=table_name,
-            chunk_size=CHUNK_SIZE,
-            file_type=file_type
+            file_type=file_type,
+            config=config,
         )
 
 
 if __name__ == "__main__":
 
-    inspector = inspect(engine)
-    YELLOW_TAXI_SCHEMA = utils.get_yellow_trip_schema()
-    GREEN_TAXI_SCHEMA = utils.get_green_trip_schema()
-
-    if inspector.has_table("taxi_zone_lookup"):        
-        logger.info("Zone-Lookup table already exists. Skipping load.")
-        pass
-    else:
-        zone_data_etl()
-    
-    if inspector.has_table("yellow_taxi_data"):
-        logger.info("Yellow-Zone table already exists. Skipping table creation.")
-        pass
-    else:
-        utils.create_table_if_not_exists(DB_CONFIG, "yellow_taxi_data", YELLOW_TAXI_SCHEMA)
-
-    if inspector.has_table("green_taxi_data"):
-        logger.info("Green-Zone table already exists. Skipping table creation.")
-        pass
-    else:
-        utils.create_table_if_not_exists(DB_CONFIG, "green_taxi_data", GREEN_TAXI_SCHEMA)
- 
-        
     main()
@@ -0,0 +1,198 @@
+import os
+import glob
+import shutil
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from sinks import Sink
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+OD_MATRIX_DIR = os.path.join(parent_dir, "data", "od_matrices")
+
+# LocationIDs run 1..N_ZONES; matrix index = LocationID - 1
+N_ZONES = 265
+N_HOURS = 24
+
+# Measure name -> source column summed per cell (None counts trips)
+OD_MEASURES = {
+    "trip_count": None,
+    "total_amount_sum": "total_amount",
+    "trip_distance_miles_sum": "trip_distance_miles",
+}
+
+Selector = Optional[Union[int, Iterable[int]]]
+
+
+class ODMatrix:
+    """Hour-of-day x pickup zone x dropoff zone arrays of trip counts and sums.
+
+    Each measure is a dense (24, 265, 265) array; cell ``[h, pu - 1, do - 1]``
+    aggregates the trips picked up during hour ``h`` in zone ``pu`` and dropped off
+    in zone ``do``.
+    """
+
+    def __init__(self, arrays: Optional[Dict[str, np.ndarray]] = None):
+        if arrays is None:
+            arrays = {
+                measure: np.zeros((N_HOURS, N_ZONES, N_ZONES), dtype=np.int64 if source is None else np.float64)
+                for measure, source in OD_MEASURES.items()
+            }
+        self.arrays = arrays
+
+    def update(self, df: pd.DataFrame):
+        """Accumulates a transformed chunk with one unbuffered np.add.at per measure."""
+
+        pickup = df["pickup_datetime"]
+        pu = df["pickup_location_id"].to_numpy(dtype="float64", na_value=-1).astype(np.int64)
+        do = df["dropoff_location_id"].to_numpy(dtype="float64", na_value=-1).astype(np.int64)
+        hour = pickup.dt.hour.to_numpy(dtype="float64", na_value=-1).astype(np.int64)
+
+        valid = (pu >= 1) & (pu <= N_ZONES) & (do >= 1) & (do <= N_ZONES) & (hour >= 0)
+        cells = (hour[valid] * N_ZONES + (pu[valid] - 1)) * N_ZONES + (do[valid] - 1)
+
+        # Chunks touch a few thousand of the 1.7M cells, so scatter-add instead of a dense bincount
+        for measure, source in OD_MEASURES.items():
+            target = self.arrays[measure].reshape(-1)
+            if source is None:
+                np.add.at(target, cells, 1)
+            elif source in df.columns:
+                weights = df[source].to_numpy(dtype="float64", na_value=0.0)[valid]
+                np.add.at(target, cells, np.nan_to_num(weights))
+
+    def merge(self, other: "ODMatrix"):
+        for measure in OD_MEASURES:
+            self.arrays[measure] = self.arrays[measure] + other.arrays[measure]
+
+    @staticmethod
+    def _index(selector: Selector, offset: int):
+        if selector is None:
+            return slice(None)
+        if isinstance(selector, int):
+            return [selector - offset]
+        return [value - offset for value in selector]
+
+    def flows(self, measure: str = "trip_count", pickup: Selector = None, dropoff: Selector = None,
+              hours: Selector = None) -> np.ndarray:
+        """
+        Slice a measure down to the requested zones/hours and sum over the hours.
+
+        Args:
+            measure: One of OD_MEASURES
+            pickup: Pickup LocationID(s), or None for all
+            dropoff: Dropoff LocationID(s), or None for all
+            hours: Hour(s) of day 0-23, or None for all
+
+        Returns:
+            A (len(pickup), len(dropoff)) array
+        """
+        array = self.arrays[measure]
+        hour_idx = self._index(hours, 0)
+        pickup_idx = self._index(pickup, 1)
+        dropoff_idx = self._index(dropoff, 1)
+
+        return array[hour_idx][:, pickup_idx][:, :, dropoff_idx].sum(axis=0)
+
+    def top_flows(self, n: int = 10, measure: str = "trip_count", hours: Selector = None) -> pd.DataFrame:
+        """Returns the n largest pickup -> dropoff flows of a measure."""
+
+        flows = self.flows(measure, hours=hours)
+        top = np.argsort(flows, axis=None)[::-1][:n]
+        pu, do = np.unravel_index(top, flows.shape)
+
+        return pd.DataFrame({
+            "pickup_location_id": pu + 1,
+            "dropoff_location_id": do + 1,
+            measure: flows[pu, do],
+        })
+
+    def save(self, directory: str):
+        """Writes one .npy file per measure, replacing the directory atomically."""
+
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for measure, array in self.arrays.items():
+            np.save(os.path.join(tmp_dir, f"{measure}.npy"), array)
+
+        old_dir = f"{directory}.old"
+        if os.path.exists(directory):
+            os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ODMatrix":
+        """Opens a persisted matrix; with ``mmap`` the arrays are read lazily from disk."""
+
+        mmap_mode = "r" if mmap else None
+        return cls({
+            measure: np.load(os.path.join(directory, f"{measure}.npy"), mmap_mode=mmap_mode)
+            for measure in OD_MEASURES
+        })
+
+
+def get_od_matrix_dir(zone: str, source_file: str, od_dir: str = OD_MATRIX_DIR) -> str:
+    """Returns where the OD matrix of one source file is persisted."""
+
+    return os.path.join(od_dir, zone, source_file.split('.')[0])
+
+
+def load_od_matrix(zone: str, year: int, month: Optional[int] = None, od_dir: str = OD_MATRIX_DIR) -> ODMatrix:
+    """
+    Load the OD matrix of a month, or the merged matrices of a whole year.
+
+    Args:
+        zone: The zone of the trip data ('yellow' or 'green')
+        year: Year to load
+        month: Month to load, or None to merge every month of the year
+        od_dir: Root directory of the persisted matrices
+
+    Returns:
+        e.g. ``load_od_matrix('yellow', 2021, 1).flows(pickup=132, hours=range(6, 10))``
+    """
+    period = f"{year}-{month:02d}" if month else f"{year}-*"
+    directories: List[str] = sorted(
+        path for path in glob.glob(os.path.join(od_dir, zone, f"*_{period}"))
+        # Skip in-flight '.tmp'/'.old' directories of a concurrent save
+        if os.path.isdir(path) and "." not in os.path.basename(path)
+    )
+    if not directories:
+        raise FileNotFoundError(f"No OD matrices for {zone} {period} under {od_dir}")
+
+    if len(directories) == 1:
+        return ODMatrix.load(directories[0])
+
+    merged = ODMatrix()
+    for directory in directories:
+        merged.merge(ODMatrix.load(directory))
+
+    return merged
+
+
+class ODMatrixSink(Sink):
+    """Accumulates a file's OD matrix from every chunk and persists it when the run completes."""
+
+    name = "od_matrix"
+    destination = False
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.matrix = ODMatrix()
+
+    def _write(self, df: pd.DataFrame):
+        self.matrix.update(df)
+
+    def _close(self):
+        os.makedirs(os.path.dirname(self.directory), exist_ok=True)
+        self.matrix.save(self.directory)
+        logger.info(f"Saved OD matrix of {self.rows_written} rows to {self.directory}")
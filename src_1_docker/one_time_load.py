@@ -1,45 +1,28 @@
 import pandas as pd
-from sqlalchemy import create_engine
-import io
-from dotenv import load_dotenv
-import os
+from typing import Optional
+from config import PipelineConfig
 from utils import create_table_if_not_exists, load_to_postgres
 import logging
 
 
-parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-env_file = os.path.join(parent_dir, ".env")
-
-load_dotenv(os.path.join(env_file))
-
-
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Database configuration
-DB_URI = os.getenv("POSTGRES_ENGINE_URI")
-engine = create_engine(DB_URI)
-
-DB_CONFIG = {
-    'host': 'localhost',
-    'database': 'nyc_taxi',
-    'user': os.getenv("POSTGRES_USER"),
-    'password': os.getenv("POSTGRES_PASSWORD"),
-    'port': 5432
-}
-
 zone_url = "https://d37ci6vzurychx.cloudfront.net/misc/taxi_zone_lookup.csv"
 
 
-def zone_data_etl(url=zone_url) -> pd.DataFrame:
+def zone_data_etl(url=zone_url, config: Optional[PipelineConfig] = None) -> pd.DataFrame:
     """Extract-Transform-Load the taxi zone lookup file
     Args:
         url (str): The URL of the taxi zone lookup CSV file.
+        config (PipelineConfig): Database settings; defaults to PipelineConfig.from_env().
     Returns:
         pd.DataFrame: The transformed DataFrame with renamed columns.
     """
-    
+    if config is None:
+        config = PipelineConfig.from_env()
+
     df_zone = pd.read_csv(url)
 
     df_zone.rename(columns={
@@ -50,9 +33,9 @@ def zone_data_etl(url=zone_url) -> pd.DataFrame:
             }, inplace=True)
     
     tbl_name = 'taxi_zone_lookup'
-    zone_schema = pd.io.sql.get_schema(df_zone, name=tbl_name, con=engine)
-    create_table_if_not_exists(DB_CONFIG, tbl_name, zone_schema)    
-    load_to_postgres(df_zone, DB_CONFIG, tbl_name)
+    zone_schema = pd.io.sql.get_schema(df_zone, name=tbl_name, con=config.get_engine())
+    create_table_if_not_exists(config.db_config, tbl_name, zone_schema)    
+    load_to_postgres(df_zone, config.db_config, tbl_name)
 
     logger.info(f"Zone table loaded successfully. Total rows: {len(df_zone)}")
     
@@ -0,0 +1,152 @@
+import os
+import uuid
+import shutil
+import logging
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sinks import Sink
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+ROW_GROUP_SIZE = 250_000
+# Rows sorted together on close; bounds the memory of the rewrite to about two batches
+SORT_BATCH_ROWS = 1_000_000
+COMPRESSION = "zstd"
+SORT_COLUMN = "pickup_datetime"
+PART_FILE = "part-0.parquet"
+
+
+def get_sibling_root(root: str, suffix: str) -> str:
+    """Returns the directory next to a dataset root, e.g. data/lake -> data/lake_staging."""
+
+    root = os.path.abspath(root)
+    return os.path.join(os.path.dirname(root), f"{os.path.basename(root)}_{suffix}")
+
+
+def get_staging_root(root: str) -> str:
+    """Where partitions of a dataset are spooled before being swapped in."""
+
+    return get_sibling_root(root, "staging")
+
+
+def get_quarantine_root(root: str) -> str:
+    """The separate dataset holding rows rejected by the quality gate."""
+
+    return get_sibling_root(root, "quarantine")
+
+
+class ParquetLakeSink(Sink):
+    """Writes one taxi_type/year/month partition of a Hive-partitioned Parquet dataset.
+
+    Chunks are spooled to a staging directory next to the dataset root. On
+    ``close`` the spool is streamed back in batches of ``sort_batch_rows``, each
+    batch is sorted by pickup time and rewritten with zstd, sized row groups and
+    column statistics, and the finished file is published with a single
+    ``os.replace`` over the partition's one part file, so a reprocessed month replaces
+    exactly its own partition and readers see either the old or the new month, never
+    neither. Nothing but finished part files ever lives under the root, so any reader
+    (pyarrow.dataset, DuckDB's read_parquet with a glob) sees a consistent dataset.
+    A failure before that rename leaves the existing partition untouched.
+
+    Sorting is per batch, not per month, so memory stays bounded regardless of the
+    month's size. Row groups within a batch do not overlap in pickup time; since
+    source files are close to time-ordered, row groups of consecutive batches
+    overlap only at their edges, which keeps min/max pruning effective.
+    """
+
+    name = "parquet"
+
+    def __init__(self, root: str, taxi_type: str, year: int, month: int,
+                 row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION,
+                 sort_batch_rows: int = SORT_BATCH_ROWS):
+        super().__init__()
+        self.root = root
+        self.row_group_size = row_group_size
+        self.sort_batch_rows = sort_batch_rows
+        self.compression = compression
+        self.partition_dir = os.path.join(root, f"taxi_type={taxi_type}", f"year={year}", f"month={month}")
+        self.part_path = os.path.join(self.partition_dir, PART_FILE)
+
+        os.makedirs(root, exist_ok=True)
+        # The staging root is a sibling of the dataset root, so the final rename stays on one filesystem
+        self._staging_dir = os.path.join(get_staging_root(root), uuid.uuid4().hex)
+        os.makedirs(self._staging_dir)
+        self._spool_path = os.path.join(self._staging_dir, "spool.parquet")
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._schema: Optional[pa.Schema] = None
+
+    def _write(self, df: pd.DataFrame):
+        """Appends a transformed chunk to the partition's spool."""
+
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            # The spool is rewritten on close, so favour write speed over size here
+            self._writer = pq.ParquetWriter(self._spool_path, self._schema, compression="lz4")
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+
+        self._writer.write_table(table)
+
+    def _close(self):
+        """Sorts the spooled rows and atomically replaces the partition with them."""
+
+        if self._writer is None:
+            logger.info(f"No rows for {self.partition_dir}; leaving it untouched")
+            self._abort()
+            return
+
+        self._writer.close()
+        self._writer = None
+
+        # Read back with the spool's own schema: categoricals return as dictionary<large_string>
+        staged_path = os.path.join(self._staging_dir, PART_FILE)
+        with pq.ParquetFile(self._spool_path, memory_map=True) as spool, \
+                pq.ParquetWriter(staged_path, spool.schema_arrow,
+                                 compression=self.compression, write_statistics=True) as writer:
+            for table in self._sorted_batches(spool):
+                writer.write_table(table, row_group_size=self.row_group_size)
+
+        os.makedirs(self.partition_dir, exist_ok=True)
+        os.replace(staged_path, self.part_path)
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+
+        logger.info(f"Wrote {self.rows_written} rows to {self.partition_dir}")
+
+    def _sorted_batches(self, spool: pq.ParquetFile):
+        """Yields the spool as tables of up to ``sort_batch_rows`` rows, each sorted by pickup time."""
+
+        pending = []
+        pending_rows = 0
+
+        for batch in spool.iter_batches(batch_size=self.row_group_size):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= self.sort_batch_rows:
+                yield self._sort(pa.Table.from_batches(pending, schema=spool.schema_arrow))
+                pending = []
+                pending_rows = 0
+
+        if pending:
+            yield self._sort(pa.Table.from_batches(pending, schema=spool.schema_arrow))
+
+    @staticmethod
+    def _sort(table: pa.Table) -> pa.Table:
+        if SORT_COLUMN in table.column_names:
+            return table.sort_by([(SORT_COLUMN, "ascending")])
+        return table
+
+    def _abort(self):
+        """Discards the spool; only the staging directory is removed, never the partition."""
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
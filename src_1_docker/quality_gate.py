@@ -0,0 +1,142 @@
+import re
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import zone_enrichment
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Rule names double as the reason codes written to the quarantine sink
+QUALITY_RULES = [
+    "null_pickup_datetime",
+    "null_dropoff_datetime",
+    "coerced_to_null",
+    "non_positive_duration",
+    "outside_file_month",
+    "negative_fare",
+    "unknown_pickup_zone",
+    "unknown_dropoff_zone",
+]
+
+FILE_PERIOD_PATTERN = re.compile(r"_(\d{4})-(\d{2})\.")
+
+
+def get_file_period(url: str) -> Optional[pd.Period]:
+    """Returns the month a '<taxi>_tripdata_YYYY-MM.<ext>' file covers, or None if it can't be parsed."""
+
+    match = FILE_PERIOD_PATTERN.search(url)
+    if not match:
+        return None
+
+    return pd.Period(year=int(match.group(1)), month=int(match.group(2)), freq="M")
+
+
+class QualityGate:
+    """Vectorized, rule-based row validation for transformed trip chunks.
+
+    Every rule is a boolean mask over the chunk; rows failing any rule are removed
+    from the chunk and buffered with their reason codes until ``drain`` is called.
+    """
+
+    def __init__(self, period: Optional[pd.Period] = None, check_zones: bool = True):
+        self.period = period
+        self.check_zones = check_zones
+        self.counts: Dict[str, int] = dict.fromkeys(QUALITY_RULES, 0)
+        self.rows_checked = 0
+        self.rows_failed = 0
+        self._rejected: List[pd.DataFrame] = []
+
+    @staticmethod
+    def snapshot(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Records which raw values are present before normalize_schema coerces them."""
+
+        return df[[col for col in columns if col in df.columns]].notna()
+
+    @staticmethod
+    def coerced_mask(df: pd.DataFrame, raw_notna: pd.DataFrame) -> pd.Series:
+        """Rows where normalize_schema turned a present value into a null."""
+
+        return (raw_notna & df[raw_notna.columns].isna()).any(axis=1)
+
+    def evaluate(self, df: pd.DataFrame, coerced: pd.Series) -> pd.DataFrame:
+        """Evaluates every rule on a renamed chunk and returns one boolean column per rule."""
+
+        pickup = df["pickup_datetime"]
+        dropoff = df["dropoff_datetime"]
+        no_rows = np.zeros(len(df), dtype=bool)
+
+        masks = {
+            "null_pickup_datetime": pickup.isna().to_numpy(),
+            "null_dropoff_datetime": dropoff.isna().to_numpy(),
+            "coerced_to_null": coerced.to_numpy(dtype=bool),
+            # NaT comparisons are False, so null timestamps only trip the null rules
+            "non_positive_duration": (dropoff <= pickup).to_numpy(dtype=bool),
+            "outside_file_month": no_rows,
+            "negative_fare": (df["fare_amount"] < 0).to_numpy(dtype=bool, na_value=False)
+            if "fare_amount" in df.columns else no_rows,
+            "unknown_pickup_zone": no_rows,
+            "unknown_dropoff_zone": no_rows,
+        }
+
+        if self.period is not None:
+            month_start = self.period.start_time
+            month_end = (self.period + 1).start_time
+            masks["outside_file_month"] = ((pickup < month_start) | (pickup >= month_end)).to_numpy(dtype=bool)
+
+        if self.check_zones:
+            zones = zone_enrichment.get_zone_lookup()
+            masks["unknown_pickup_zone"] = ~zones.is_known(df["pickup_location_id"])
+            masks["unknown_dropoff_zone"] = ~zones.is_known(df["dropoff_location_id"])
+
+        return pd.DataFrame(masks, index=df.index)
+
+    def apply(self, df: pd.DataFrame, coerced: pd.Series) -> pd.DataFrame:
+        """
+        Split a chunk into passing rows (returned) and failing rows (buffered for quarantine).
+
+        Args:
+            df: Renamed, normalized trip chunk
+            coerced: Rows with values nulled by normalize_schema (see ``coerced_mask``)
+
+        Returns:
+            The rows that passed every rule
+        """
+        masks = self.evaluate(df, coerced)
+        mask_values = masks.to_numpy()
+        failed = mask_values.any(axis=1)
+
+        self.rows_checked += len(df)
+        for rule, count in zip(QUALITY_RULES, mask_values.sum(axis=0)):
+            self.counts[rule] += int(count)
+
+        n_failed = int(failed.sum())
+        if n_failed:
+            self.rows_failed += n_failed
+            rule_names = np.array(QUALITY_RULES, dtype=object)
+            rejected = df[failed].copy()
+            rejected["reason_codes"] = ["|".join(rule_names[row]) for row in mask_values[failed]]
+            self._rejected.append(rejected)
+
+        return df[~failed]
+
+    def drain(self) -> pd.DataFrame:
+        """Returns and clears the rows quarantined since the last drain."""
+
+        if not self._rejected:
+            return pd.DataFrame()
+
+        rejected = pd.concat(self._rejected, ignore_index=True)
+        self._rejected = []
+
+        return rejected
+
+    def summary(self) -> Dict[str, int]:
+        """Per-rule failure counts plus checked/failed row totals for the run summary."""
+
+        return {"rows_checked": self.rows_checked, "rows_failed": self.rows_failed, **self.counts}
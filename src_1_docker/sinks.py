@@ -0,0 +1,336 @@
+import os
+import gzip
+import logging
+from typing import Callable, Dict, Any, List, Optional
+
+import pandas as pd
+
+import utils as utils
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+POSTGRES_BUFFER_ROWS = 100_000
+DUCKDB_BUFFER_ROWS = 100_000
+
+
+class Sink:
+    """A destination for transformed chunks.
+
+    Chunks passed to ``write`` are buffered until ``buffer_rows`` rows are pending
+    and then handed to ``_write`` as one frame. Subclasses implement ``_write`` and
+    optionally ``_close``/``_abort``. Sinks must not modify the frames they receive,
+    since the same chunk is shared by every sink of a fan-out.
+
+    ``destination`` marks sinks that load the data somewhere (a table, a dataset, a
+    file); derived outputs such as sketches set it to False so their success never
+    hides a failed load.
+    """
+
+    name = "sink"
+    destination = True
+
+    def __init__(self, buffer_rows: int = 0):
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_rows = 0
+
+    def write(self, df: pd.DataFrame):
+        if not len(df):
+            return
+
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        if self._buffered_rows >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+
+        df = self._buffer[0] if len(self._buffer) == 1 else pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        self._buffered_rows = 0
+
+        self._write(df)
+        self.rows_written += len(df)
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def abort(self):
+        self._buffer = []
+        self._buffered_rows = 0
+        self._abort()
+
+    def _write(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _abort(self):
+        pass
+
+
+class PostgresCopySink(Sink):
+    """Loads chunks into a Postgres table with COPY, in one transaction per run.
+
+    Every batch is copied on the same connection and committed on ``close``, so a
+    failed run leaves none of its rows behind. ``on_begin(cursor)`` runs once at the
+    start of that transaction, even for a run without rows, e.g. to delete what a
+    previous load of the same file wrote; ``on_batch(cursor, df)`` runs after each
+    batch is copied, e.g. to upsert the batch's rollup, so derived tables only ever
+    count rows that were loaded.
+
+    With ``sort_by`` each buffered batch is ordered by that column before COPY, so
+    consecutive heap blocks cover narrow value ranges (what BRIN indexes rely on).
+
+    Batches are copied into the columns the table has; source columns it lacks (e.g.
+    fees TLC added to newer files) are dropped with a warning instead of failing COPY.
+    Hooks still receive the full batch.
+    """
+
+    name = "postgres"
+
+    def __init__(self, db_config: Dict[str, Any], table_name: str, buffer_rows: int = POSTGRES_BUFFER_ROWS,
+                 sort_by: Optional[str] = None, on_batch: Optional[Callable[[Any, pd.DataFrame], None]] = None,
+                 on_begin: Optional[Callable[[Any], None]] = None):
+        super().__init__(buffer_rows)
+        self.db_config = db_config
+        self.table_name = table_name
+        self.sort_by = sort_by
+        self.on_batch = on_batch
+        self.on_begin = on_begin
+        self._conn = None
+        self._table_columns: List[str] = []
+        self._dropped_columns: set = set()
+
+    def _connect(self):
+        import psycopg2
+
+        self._conn = psycopg2.connect(**self.db_config)
+        with self._conn.cursor() as cursor:
+            self._table_columns = utils.get_table_columns(cursor, self.table_name)
+            if self.on_begin is not None:
+                self.on_begin(cursor)
+
+    def _project(self, df: pd.DataFrame) -> pd.DataFrame:
+        # An unknown table keeps every column, so COPY reports the missing table itself
+        if not self._table_columns:
+            return df
+
+        dropped = [col for col in df.columns if col not in self._table_columns]
+        new_drops = set(dropped) - self._dropped_columns
+        if new_drops:
+            logger.warning(f"Columns {sorted(new_drops)} are not in '{self.table_name}' and are not loaded")
+            self._dropped_columns |= new_drops
+
+        return df.drop(columns=dropped) if dropped else df
+
+    def _write(self, df: pd.DataFrame):
+        if self._conn is None:
+            self._connect()
+
+        if self.sort_by and self.sort_by in df.columns:
+            df = df.sort_values(self.sort_by, kind="stable", na_position="last")
+
+        logger.info(f"Copying {len(df)} rows to PostgreSQL table '{self.table_name}'")
+        with self._conn.cursor() as cursor:
+            utils.copy_frame(cursor, self._project(df), self.table_name)
+            if self.on_batch is not None:
+                self.on_batch(cursor, df)
+
+    def _close(self):
+        if self._conn is None:
+            if self.on_begin is None:
+                return
+            self._connect()
+
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+        logger.info(f"Committed {self.rows_written} rows to '{self.table_name}'")
+
+    def _abort(self):
+        if self._conn is None:
+            return
+
+        try:
+            self._conn.rollback()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+class CsvFileSink(Sink):
+    """Writes chunks to a single CSV (or .csv.gz) file, e.g. for GCS/BigQuery uploads.
+
+    Rows go to a '.tmp' file that is renamed over ``path`` on close, so a failed run
+    never leaves a truncated file behind.
+    """
+
+    name = "csv"
+
+    def __init__(self, path: str, buffer_rows: int = 0):
+        super().__init__(buffer_rows)
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+
+    def _write(self, df: pd.DataFrame):
+        header = self._file is None
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if self.path.endswith(".gz"):
+                self._file = gzip.open(self._tmp_path, "wt", newline="")
+            else:
+                self._file = open(self._tmp_path, "w", newline="")
+
+        df.to_csv(self._file, index=False, header=header)
+
+    def _close(self):
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"Wrote {self.rows_written} rows to {self.path}")
+
+    def _abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class DuckDBSink(Sink):
+    """Appends chunks to a DuckDB table by scanning them as Arrow tables.
+
+    All writes of a run happen in one transaction, committed on close.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, path: str, table_name: str, buffer_rows: int = DUCKDB_BUFFER_ROWS):
+        super().__init__(buffer_rows)
+
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("DuckDBSink requires the 'duckdb' package") from e
+
+        self.path = path
+        self.table_name = table_name
+        self._con = duckdb.connect(path)
+        self._con.execute("BEGIN TRANSACTION")
+
+    def _write(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        self._con.register("sink_chunk", pa.Table.from_pandas(df, preserve_index=False))
+        try:
+            self._con.execute(f"CREATE TABLE IF NOT EXISTS {self.table_name} AS SELECT * FROM sink_chunk LIMIT 0")
+            self._con.execute(f"INSERT INTO {self.table_name} BY NAME SELECT * FROM sink_chunk")
+        finally:
+            self._con.unregister("sink_chunk")
+
+    def _close(self):
+        self._con.execute("COMMIT")
+        self._con.close()
+        logger.info(f"Wrote {self.rows_written} rows to {self.path}:{self.table_name}")
+
+    def _abort(self):
+        try:
+            self._con.execute("ROLLBACK")
+        finally:
+            self._con.close()
+
+
+class SinkFanOut:
+    """Sends every chunk to several sinks in one pass, isolating sink failures.
+
+    A sink that raises is aborted and dropped; the remaining sinks keep receiving
+    chunks. ``write`` and ``close`` raise once every destination sink has failed;
+    callers check ``failed_destinations`` after ``close`` to fail runs in which only
+    some destinations failed. Derived (non-destination) sinks are closed only after
+    every destination closed successfully and are aborted otherwise, so they never
+    persist anything about rows that were not loaded.
+    """
+
+    def __init__(self, sinks: List[Sink]):
+        self.sinks = list(sinks)
+        self.failed: Dict[str, Exception] = {}
+        self._destinations = {sink.name for sink in self.sinks if sink.destination}
+
+    @property
+    def failed_destinations(self) -> Dict[str, Exception]:
+        return {name: error for name, error in self.failed.items() if name in self._destinations}
+
+    def _all_destinations_failed(self) -> bool:
+        return bool(self._destinations) and self._destinations <= set(self.failed)
+
+    def _isolate(self, sink: Sink, error: Exception):
+        logger.error(f"Sink '{sink.name}' failed and was dropped: {error}")
+        self.failed[sink.name] = error
+        self.sinks.remove(sink)
+        self._abort_sink(sink)
+
+    @staticmethod
+    def _abort_sink(sink: Sink):
+        try:
+            sink.abort()
+        except Exception as e:
+            logger.error(f"Sink '{sink.name}' failed to abort cleanly: {e}")
+
+    def write(self, df: pd.DataFrame):
+        for sink in list(self.sinks):
+            try:
+                sink.write(df)
+            except Exception as e:
+                self._isolate(sink, e)
+
+        if self._all_destinations_failed():
+            raise RuntimeError(f"All destination sinks failed: {self.failed_destinations}")
+
+    def close(self) -> Dict[str, int]:
+        """Flushes and closes the healthy sinks, destinations first, and returns rows written per sink."""
+
+        written = {}
+        destinations = [sink for sink in self.sinks if sink.destination]
+        derived = [sink for sink in self.sinks if not sink.destination]
+
+        for sink in destinations:
+            try:
+                sink.close()
+                written[sink.name] = sink.rows_written
+            except Exception as e:
+                self._isolate(sink, e)
+
+        for sink in derived:
+            if self.failed_destinations:
+                logger.warning(f"Sink '{sink.name}' discarded because a destination failed")
+                self._abort_sink(sink)
+                continue
+            try:
+                sink.close()
+                written[sink.name] = sink.rows_written
+            except Exception as e:
+                self._isolate(sink, e)
+
+        self.sinks = []
+        if self._all_destinations_failed():
+            raise RuntimeError(f"All destination sinks failed: {self.failed_destinations}")
+
+        return written
+
+    def abort(self):
+        for sink in self.sinks:
+            self._abort_sink(sink)
+        self.sinks = []
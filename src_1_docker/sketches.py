@@ -0,0 +1,302 @@
+import os
+import glob
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sinks import Sink
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+SKETCH_DIR = os.path.join(parent_dir, "data", "sketches")
+
+QUANTILE_COLS = [
+    "fare_amount",
+    "tip_amount",
+    "total_amount",
+    "trip_distance_miles",
+    "trip_duration_secs",
+]
+
+# Distinct-count sketch name -> columns whose value combination is counted
+DISTINCT_COLS = {
+    "routes": ["pickup_location_id", "dropoff_location_id"],
+    "vendors": ["vendor_id"],
+}
+
+
+class QuantileSketch:
+    """Mergeable relative-error quantile sketch (DDSketch-style log buckets).
+
+    Every value lands in bucket ``ceil(log_gamma(|x|))`` of a dense positive or
+    negative array, so updates are a single ``np.bincount`` per chunk, merging is
+    array addition, and any quantile is within ``relative_accuracy`` of the true
+    value for magnitudes inside [MIN_VALUE, MAX_VALUE].
+    """
+
+    RELATIVE_ACCURACY = 0.01
+    MIN_VALUE = 1e-6
+    MAX_VALUE = 1e9
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_key = int(np.floor(np.log(self.MIN_VALUE) / self._log_gamma))
+        self.max_key = int(np.ceil(np.log(self.MAX_VALUE) / self._log_gamma))
+
+        n_keys = self.max_key - self.min_key + 1
+        self.positive = np.zeros(n_keys, dtype=np.int64)
+        self.negative = np.zeros(n_keys, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _bucket(self, magnitudes: np.ndarray) -> np.ndarray:
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        keys = np.clip(keys, self.min_key, self.max_key) - self.min_key
+        return np.bincount(keys, minlength=len(self.positive))
+
+    def update(self, values: np.ndarray):
+        """Adds a batch of values; NaNs are ignored."""
+
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+
+        tiny = np.abs(values) < self.MIN_VALUE
+        self.zero_count += int(tiny.sum())
+        self.positive += self._bucket(values[(values > 0) & ~tiny])
+        self.negative += self._bucket(-values[(values < 0) & ~tiny])
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch"):
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _value(self, key_index: int) -> float:
+        key = key_index + self.min_key
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the approximate q-quantile (0 <= q <= 1), or None if the sketch is empty."""
+
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+
+        # Ascending order: most negative first, then zeros, then positives
+        negative_cum = np.cumsum(self.negative[::-1])
+        n_negative = int(negative_cum[-1])
+        if rank < n_negative:
+            idx = int(np.searchsorted(negative_cum, rank, side="right"))
+            value = -self._value(len(self.negative) - 1 - idx)
+        elif rank < n_negative + self.zero_count:
+            value = 0.0
+        else:
+            positive_cum = np.cumsum(self.positive)
+            idx = int(np.searchsorted(positive_cum, rank - n_negative - self.zero_count, side="right"))
+            value = self._value(min(idx, len(self.positive) - 1))
+
+        return float(np.clip(value, self.min, self.max))
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f"{prefix}/positive": self.positive,
+            f"{prefix}/negative": self.negative,
+            f"{prefix}/stats": np.array([self.zero_count, self.count, self.min, self.max, self.relative_accuracy]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> "QuantileSketch":
+        zero_count, count, min_value, max_value, relative_accuracy = arrays[f"{prefix}/stats"]
+        sketch = cls(relative_accuracy=float(relative_accuracy))
+        sketch.positive = arrays[f"{prefix}/positive"].astype(np.int64)
+        sketch.negative = arrays[f"{prefix}/negative"].astype(np.int64)
+        sketch.zero_count = int(zero_count)
+        sketch.count = int(count)
+        sketch.min = float(min_value)
+        sketch.max = float(max_value)
+        return sketch
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes (2**precision uint8 registers)."""
+
+    PRECISION = 14
+
+    def __init__(self, precision: int = PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    def _bit_length(values: np.ndarray) -> np.ndarray:
+        """Exact bit length of non-zero uint64 values, by vectorized binary search."""
+
+        x = values.copy()
+        length = np.ones(len(x), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            high = x >= (np.uint64(1) << np.uint64(shift))
+            length[high] += shift
+            x[high] >>= np.uint64(shift)
+        return length
+
+    def update_hashes(self, hashes: np.ndarray):
+        """Adds a batch of uint64 hashes."""
+
+        if not len(hashes):
+            return
+
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # A guard bit below the remaining 64 - p bits keeps the rank bounded
+        remainder = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - self._bit_length(remainder).astype(np.int16)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, df: pd.DataFrame):
+        """Adds the distinct row values of a frame (all columns combined); rows with nulls are skipped."""
+
+        df = df.dropna()
+        self.update_hashes(pd.util.hash_pandas_object(df, index=False).to_numpy())
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * np.log(m / zeros)))
+
+        return int(round(raw))
+
+
+class TripSketches:
+    """The per-file set of quantile and distinct-count sketches."""
+
+    def __init__(self):
+        self.quantiles: Dict[str, QuantileSketch] = {col: QuantileSketch() for col in QUANTILE_COLS}
+        self.distinct: Dict[str, HyperLogLog] = {name: HyperLogLog() for name in DISTINCT_COLS}
+
+    def update(self, df: pd.DataFrame):
+        """Updates every sketch with a transformed chunk."""
+
+        for col, sketch in self.quantiles.items():
+            if col in df.columns:
+                sketch.update(df[col].to_numpy(dtype="float64", na_value=np.nan))
+
+        for name, cols in DISTINCT_COLS.items():
+            if all(col in df.columns for col in cols):
+                self.distinct[name].update(df[cols])
+
+    def merge(self, other: "TripSketches"):
+        for col, sketch in self.quantiles.items():
+            sketch.merge(other.quantiles[col])
+        for name, sketch in self.distinct.items():
+            sketch.merge(other.distinct[name])
+
+    def quantile(self, col: str, q: float) -> Optional[float]:
+        return self.quantiles[col].quantile(q)
+
+    def distinct_count(self, name: str) -> int:
+        return self.distinct[name].estimate()
+
+    def save(self, path: str):
+        """Writes the sketches to a compressed .npz file, replacing it atomically."""
+
+        arrays = {}
+        for col, sketch in self.quantiles.items():
+            arrays.update(sketch.to_arrays(f"quantile/{col}"))
+        for name, sketch in self.distinct.items():
+            arrays[f"hll/{name}"] = sketch.registers
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TripSketches":
+        sketches = cls()
+        with np.load(path) as arrays:
+            for col in QUANTILE_COLS:
+                sketches.quantiles[col] = QuantileSketch.from_arrays(arrays, f"quantile/{col}")
+            for name in DISTINCT_COLS:
+                registers = arrays[f"hll/{name}"]
+                sketches.distinct[name] = HyperLogLog(precision=int(np.log2(len(registers))))
+                sketches.distinct[name].registers = registers.copy()
+        return sketches
+
+
+def get_sketch_path(zone: str, source_file: str, sketch_dir: str = SKETCH_DIR) -> str:
+    """Returns where the sketches of one source file are persisted."""
+
+    return os.path.join(sketch_dir, zone, f"{source_file.split('.')[0]}.npz")
+
+
+def merge_sketches(zone: str, year: int, month: Optional[int] = None, sketch_dir: str = SKETCH_DIR) -> TripSketches:
+    """
+    Merge the persisted per-file sketches of a month (or a whole year).
+
+    Args:
+        zone: The zone of the trip data ('yellow' or 'green')
+        year: Year to merge
+        month: Month to merge, or None for every month of the year
+        sketch_dir: Root directory of the persisted sketches
+
+    Returns:
+        The merged sketches, e.g. ``merge_sketches('yellow', 2021).quantile('fare_amount', 0.95)``
+    """
+    period = f"{year}-{month:02d}" if month else f"{year}-*"
+    paths: List[str] = sorted(
+        path for path in glob.glob(os.path.join(sketch_dir, zone, f"*_{period}.npz"))
+        if not path.endswith(".tmp.npz")
+    )
+    if not paths:
+        raise FileNotFoundError(f"No sketches for {zone} {period} under {sketch_dir}")
+
+    merged = TripSketches()
+    for path in paths:
+        merged.merge(TripSketches.load(path))
+
+    return merged
+
+
+class SketchSink(Sink):
+    """Updates a file's sketches with every chunk and persists them when the run completes."""
+
+    name = "sketches"
+    destination = False
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.sketches = TripSketches()
+
+    def _write(self, df: pd.DataFrame):
+        self.sketches.update(df)
+
+    def _close(self):
+        self.sketches.save(self.path)
+        logger.info(f"Saved sketches of {self.rows_written} rows to {self.path}")
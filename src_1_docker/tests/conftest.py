@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# The pipeline modules import each other as top-level modules (e.g. `import utils`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
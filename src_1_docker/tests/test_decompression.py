@@ -0,0 +1,96 @@
+import gzip
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import decompression
+from decompression import ThreadedDecompressor, bgzf_members, open_gzip
+
+
+def bgzf_compress(data: bytes, block_size: int = 64 * 1024) -> bytes:
+    """Writes data as bgzip does: deflate members whose 'BC' extra subfield holds the member size."""
+
+    members = []
+    for start in range(0, len(data), block_size):
+        block = data[start:start + block_size]
+        compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+        deflated = compressor.compress(block) + compressor.flush()
+        member_size = 12 + 6 + len(deflated) + 8
+        header = b"\x1f\x8b\x08\x04" + b"\x00" * 4 + b"\x00\xff" + struct.pack("<H", 6)
+        extra = b"BC" + struct.pack("<HH", 2, member_size - 1)
+        trailer = struct.pack("<II", zlib.crc32(block), len(block))
+        members.append(header + extra + deflated + trailer)
+    return b"".join(members)
+
+
+@pytest.fixture(scope="module")
+def csv_bytes() -> bytes:
+    rng = np.random.default_rng(3)
+    rows = (f"{i},{rng.integers(1, 266)},{rng.random() * 50:.2f}\n" for i in range(200_000))
+    return ("trip_id,pickup_location_id,fare_amount\n" + "".join(rows)).encode()
+
+
+def test_plain_gzip_round_trip(csv_bytes):
+    with open_gzip(gzip.compress(csv_bytes, compresslevel=1)) as stream:
+        assert stream.read() == csv_bytes
+
+
+def test_file_object_source_round_trip(csv_bytes):
+    with open_gzip(io.BytesIO(gzip.compress(csv_bytes, compresslevel=1))) as stream:
+        assert stream.read() == csv_bytes
+
+
+def test_multi_member_gzip_round_trip(csv_bytes):
+    half = len(csv_bytes) // 2
+    data = gzip.compress(csv_bytes[:half], compresslevel=1) + gzip.compress(csv_bytes[half:], compresslevel=1)
+
+    assert bgzf_members(data) is None
+    with open_gzip(data) as stream:
+        assert stream.read() == csv_bytes
+
+
+def test_bgzf_round_trip_is_member_parallel(csv_bytes, monkeypatch):
+    data = bgzf_compress(csv_bytes)
+    members = bgzf_members(data)
+    inflated = []
+    decompress = decompression.zlib_backend.decompress
+    monkeypatch.setattr(decompression.zlib_backend, "decompress",
+                        lambda buffer, wbits: inflated.append(len(buffer)) or decompress(buffer, wbits),
+                        raising=False)
+
+    with open_gzip(data, threads=4) as stream:
+        assert stream.read() == csv_bytes
+
+    assert len(members) > 1 and members[-1][1] == len(data)
+    assert len(inflated) == len(members)
+
+
+def test_early_close_stops_the_producer():
+    # Far more blocks than the queue holds, so the producer is blocked on a full queue
+    reader = ThreadedDecompressor(gzip.compress(b"0" * 64 * 1024 * 1024, compresslevel=1), queue_blocks=1)
+
+    assert len(reader.read(10)) == 10
+    reader.close()
+
+    assert not reader._producer.is_alive()
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_corrupt_stream_raises(csv_bytes, threads):
+    data = bytearray(bgzf_compress(csv_bytes))
+    data[len(data) // 2:len(data) // 2 + 64] = b"\x00" * 64
+
+    with pytest.raises((OSError, EOFError, zlib.error)):
+        with open_gzip(bytes(data), threads=threads) as stream:
+            stream.read()
+
+
+def test_truncated_stream_raises(csv_bytes):
+    data = gzip.compress(csv_bytes, compresslevel=1)
+
+    with pytest.raises(EOFError):
+        with open_gzip(data[:len(data) // 2]) as stream:
+            stream.read()
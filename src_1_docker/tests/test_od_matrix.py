@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from od_matrix import ODMatrix, ODMatrixSink, get_od_matrix_dir, load_od_matrix
+from sinks import Sink, SinkFanOut
+
+
+class FailingCommitSink(Sink):
+    name = "postgres"
+
+    def _write(self, df):
+        pass
+
+    def _close(self):
+        raise IOError("commit failed")
+
+
+class NullSink(Sink):
+    name = "parquet"
+
+    def _write(self, df):
+        pass
+
+
+def trips(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["pickup_datetime", "pickup_location_id", "dropoff_location_id",
+                                     "total_amount", "trip_distance_miles"])
+    df["pickup_datetime"] = pd.to_datetime(df["pickup_datetime"])
+    df["pickup_location_id"] = df["pickup_location_id"].astype("Int64")
+    df["dropoff_location_id"] = df["dropoff_location_id"].astype("Int64")
+    return df
+
+
+JANUARY = trips([
+    ("2021-01-01 08:10", 132, 230, 60.0, 17.0),
+    ("2021-01-02 08:40", 132, 230, 55.0, 16.5),
+    ("2021-01-02 09:05", 132, 230, np.nan, 17.2),
+    ("2021-01-03 18:00", 236, 237, 9.0, 0.9),
+    ("2021-01-03 18:00", None, 237, 9.0, 0.9),     # null zone: not counted
+    ("2021-01-03 18:00", 236, 999, 9.0, 0.9),      # out-of-range zone: not counted
+    (None, 236, 237, 9.0, 0.9),                    # null pickup time: not counted
+])
+
+
+def test_update_accumulates_cells():
+    matrix = ODMatrix()
+    matrix.update(JANUARY)
+
+    assert matrix.arrays["trip_count"].sum() == 4
+    assert matrix.arrays["trip_count"][8, 131, 229] == 2
+    assert matrix.arrays["total_amount_sum"][8, 131, 229] == 115.0
+    # NaN amounts count the trip but add nothing to the sum
+    assert matrix.arrays["trip_count"][9, 131, 229] == 1
+    assert matrix.arrays["total_amount_sum"][9, 131, 229] == 0.0
+
+
+def test_flows_slice_zones_and_hours():
+    matrix = ODMatrix()
+    matrix.update(JANUARY)
+
+    assert matrix.flows(pickup=132, dropoff=230).tolist() == [[3]]
+    assert matrix.flows(pickup=132, dropoff=230, hours=range(6, 9)).tolist() == [[2]]
+    assert matrix.flows(pickup=[132, 236], dropoff=[230, 237]).tolist() == [[3, 0], [0, 1]]
+    assert matrix.flows("trip_distance_miles_sum", pickup=236, dropoff=237)[0, 0] == pytest.approx(0.9)
+
+
+def test_top_flows():
+    matrix = ODMatrix()
+    matrix.update(JANUARY)
+
+    top = matrix.top_flows(n=2)
+
+    assert top.to_dict("records") == [
+        {"pickup_location_id": 132, "dropoff_location_id": 230, "trip_count": 3},
+        {"pickup_location_id": 236, "dropoff_location_id": 237, "trip_count": 1},
+    ]
+
+
+def test_sink_persists_and_months_merge(tmp_path):
+    for month in (1, 2):
+        directory = get_od_matrix_dir("yellow", f"yellow_tripdata_2021-{month:02d}.parquet", str(tmp_path))
+        sink = ODMatrixSink(directory)
+        sink.write(JANUARY)
+        sink.close()
+
+    january = load_od_matrix("yellow", 2021, 1, od_dir=str(tmp_path))
+    year = load_od_matrix("yellow", 2021, od_dir=str(tmp_path))
+
+    assert isinstance(january.arrays["trip_count"], np.memmap)
+    assert january.flows(pickup=132, dropoff=230)[0, 0] == 3
+    assert year.flows(pickup=132, dropoff=230)[0, 0] == 6
+
+
+def test_save_replaces_a_previous_matrix(tmp_path):
+    directory = str(tmp_path / "yellow_tripdata_2021-01")
+    first = ODMatrix()
+    first.update(JANUARY)
+    first.save(directory)
+
+    ODMatrix().save(directory)
+
+    assert ODMatrix.load(directory).arrays["trip_count"].sum() == 0
+    assert sorted(os.listdir(tmp_path)) == ["yellow_tripdata_2021-01"]
+
+
+def test_load_skips_in_flight_saves(tmp_path):
+    ODMatrix().save(str(tmp_path / "yellow" / "yellow_tripdata_2021-01"))
+    os.makedirs(tmp_path / "yellow" / "yellow_tripdata_2021-02.tmp")
+
+    with pytest.raises(FileNotFoundError):
+        load_od_matrix("yellow", 2021, 2, od_dir=str(tmp_path))
+
+
+def test_matrix_is_not_saved_for_a_failed_load(tmp_path):
+    directory = get_od_matrix_dir("yellow", "yellow_tripdata_2021-01.parquet", str(tmp_path))
+    fan_out = SinkFanOut([ODMatrixSink(directory), FailingCommitSink(), NullSink()])
+
+    fan_out.write(JANUARY)
+    fan_out.close()
+
+    assert list(fan_out.failed_destinations) == ["postgres"]
+    assert not os.path.exists(tmp_path / "yellow")
+    with pytest.raises(FileNotFoundError):
+        load_od_matrix("yellow", 2021, 1, od_dir=str(tmp_path))
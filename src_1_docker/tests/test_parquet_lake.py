@@ -0,0 +1,115 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import zone_enrichment
+from parquet_lake import ParquetLakeSink, get_staging_root
+from sinks import SinkFanOut
+
+
+ZONE_CSV = '''"LocationID","Borough","Zone","service_zone"
+132,"Queens","JFK Airport","Airports"
+230,"Manhattan","Times Sq/Theatre District","Yellow Zone"
+265,"N/A","Outside of NYC","N/A"
+'''
+
+
+@pytest.fixture
+def zone_file(tmp_path):
+    path = tmp_path / "taxi_zone_lookup.csv"
+    path.write_text(ZONE_CSV)
+    return str(path)
+
+
+def trips(start: str, n: int, fare: float = 10.0) -> pd.DataFrame:
+    # Pickup times run backwards so the partition has something to sort
+    return pd.DataFrame({
+        "pickup_datetime": pd.date_range(start, periods=n, freq="-1min"),
+        "pickup_location_id": pd.array([132, 230, 265] * (n // 3) + [132] * (n % 3), dtype="Int64"),
+        "dropoff_location_id": pd.array([230] * n, dtype="Int64"),
+        "fare_amount": [fare] * n,
+    })
+
+
+def read_partition(sink: ParquetLakeSink) -> pd.DataFrame:
+    return pq.read_table(sink.part_path).to_pandas()
+
+
+def test_partition_is_sorted_in_bounded_batches(tmp_path):
+    sink = ParquetLakeSink(str(tmp_path / "lake"), "yellow", 2021, 1, row_group_size=10, sort_batch_rows=20)
+    for day in range(1, 4):
+        sink.write(trips(f"2021-01-0{day} 12:00", 20))
+    sink.close()
+
+    metadata = pq.ParquetFile(sink.part_path).metadata
+    stats = [metadata.row_group(i).column(0).statistics for i in range(metadata.num_row_groups)]
+
+    assert metadata.num_rows == 60
+    assert all(prev.max <= cur.min for prev, cur in zip(stats, stats[1:]))
+    assert read_partition(sink)["pickup_location_id"].dtype == "Int64"
+    assert os.listdir(get_staging_root(str(tmp_path / "lake"))) == []
+
+
+def test_enriched_chunks_round_trip(tmp_path, zone_file):
+    sink = ParquetLakeSink(str(tmp_path / "lake"), "yellow", 2021, 1, row_group_size=4)
+    for day in range(1, 4):
+        sink.write(zone_enrichment.enrich_zones(trips(f"2021-01-0{day} 12:00", 6), path=zone_file))
+    sink.close()
+
+    df = read_partition(sink)
+
+    assert len(df) == 18
+    assert df["pickup_datetime"].is_monotonic_increasing
+    assert set(df["pickup_borough"]) == {"Queens", "Manhattan", "N/A"}
+    assert set(df["dropoff_zone"]) == {"Times Sq/Theatre District"}
+
+
+def test_reprocessing_replaces_the_partition(tmp_path):
+    root = str(tmp_path / "lake")
+    for fare in (10.0, 12.5):
+        sink = ParquetLakeSink(root, "yellow", 2021, 1)
+        sink.write(trips("2021-01-05 12:00", 9, fare=fare))
+        sink.close()
+
+    df = pd.read_parquet(root)
+
+    assert len(df) == 9
+    assert set(df["fare_amount"]) == {12.5}
+    assert os.listdir(sink.partition_dir) == ["part-0.parquet"]
+
+
+def test_failed_publish_keeps_the_previous_partition(tmp_path, monkeypatch):
+    root = str(tmp_path / "lake")
+    first = ParquetLakeSink(root, "yellow", 2021, 1)
+    first.write(trips("2021-01-05 12:00", 9))
+    first.close()
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    rerun = ParquetLakeSink(root, "yellow", 2021, 1)
+    fan_out = SinkFanOut([rerun])
+    fan_out.write(trips("2021-01-05 12:00", 3, fare=99.0))
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(RuntimeError):
+        fan_out.close()
+    monkeypatch.undo()
+
+    df = read_partition(first)
+    assert len(df) == 9 and set(df["fare_amount"]) == {10.0}
+    assert os.listdir(get_staging_root(root)) == []
+
+
+def test_abort_leaves_the_partition_untouched(tmp_path):
+    root = str(tmp_path / "lake")
+    first = ParquetLakeSink(root, "yellow", 2021, 1)
+    first.write(trips("2021-01-05 12:00", 9))
+    first.close()
+
+    rerun = ParquetLakeSink(root, "yellow", 2021, 1)
+    rerun.write(trips("2021-01-05 12:00", 3))
+    rerun.abort()
+
+    assert len(read_partition(first)) == 9
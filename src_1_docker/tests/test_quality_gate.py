@@ -0,0 +1,97 @@
+import functools
+
+import pandas as pd
+import pytest
+
+import zone_enrichment
+from quality_gate import QualityGate, get_file_period
+
+
+ZONE_CSV = '''"LocationID","Borough","Zone","service_zone"
+1,"EWR","Newark Airport","EWR"
+132,"Queens","JFK Airport","Airports"
+264,"Unknown","N/A","N/A"
+265,"N/A","Outside of NYC","N/A"
+'''
+
+
+@pytest.fixture(autouse=True)
+def zone_lookup(tmp_path, monkeypatch):
+    path = tmp_path / "taxi_zone_lookup.csv"
+    path.write_text(ZONE_CSV)
+    monkeypatch.setattr(zone_enrichment, "get_zone_lookup",
+                        functools.partial(zone_enrichment.get_zone_lookup, path=str(path)))
+    return path
+
+
+def make_trips(rows):
+    df = pd.DataFrame(rows, columns=["pickup_datetime", "dropoff_datetime", "fare_amount",
+                                     "pickup_location_id", "dropoff_location_id"])
+    df["pickup_datetime"] = pd.to_datetime(df["pickup_datetime"])
+    df["dropoff_datetime"] = pd.to_datetime(df["dropoff_datetime"])
+    df["pickup_location_id"] = df["pickup_location_id"].astype("Int64")
+    df["dropoff_location_id"] = df["dropoff_location_id"].astype("Int64")
+    return df
+
+
+def no_coercion(df):
+    return pd.Series(False, index=df.index)
+
+
+def test_get_file_period():
+    assert get_file_period("https://host/yellow_tripdata_2021-03.csv.gz") == pd.Period("2021-03", freq="M")
+    assert get_file_period("trips.parquet") is None
+
+
+def test_every_rule_flags_its_rows():
+    df = make_trips([
+        ("2021-01-05 10:00", "2021-01-05 10:20", 12.5, 132, 1),    # valid
+        (None, "2021-01-05 10:20", 12.5, 132, 1),                  # null pickup
+        ("2021-01-05 10:00", None, 12.5, 132, 1),                  # null dropoff
+        ("2021-01-05 10:00", "2021-01-05 09:00", 12.5, 132, 1),    # negative duration
+        ("2020-12-31 23:00", "2020-12-31 23:30", 12.5, 132, 1),    # previous month
+        ("2021-01-05 10:00", "2021-01-05 10:20", -3.0, 132, 1),    # negative fare
+        ("2021-01-05 10:00", "2021-01-05 10:20", 12.5, 999, 1),    # unknown pickup zone
+        ("2021-01-05 10:00", "2021-01-05 10:20", 12.5, 132, None), # null dropoff zone
+    ])
+    gate = QualityGate(period=pd.Period("2021-01", freq="M"))
+
+    passed = gate.apply(df, no_coercion(df))
+    rejected = gate.drain()
+
+    assert len(passed) == 1
+    assert list(rejected["reason_codes"]) == [
+        "null_pickup_datetime",
+        "null_dropoff_datetime",
+        "non_positive_duration",
+        "outside_file_month",
+        "negative_fare",
+        "unknown_pickup_zone",
+        "unknown_dropoff_zone",
+    ]
+    assert gate.summary()["rows_checked"] == 8
+    assert gate.summary()["rows_failed"] == 7
+    assert gate.drain().empty
+
+
+def test_lookup_placeholder_zones_are_known():
+    # Zones 264/265 carry 'N/A' values in the lookup, which must not read as missing
+    df = make_trips([
+        ("2021-01-05 10:00", "2021-01-05 10:20", 12.5, 264, 265),
+        ("2021-01-05 10:00", "2021-01-05 10:20", 12.5, 265, 264),
+    ])
+    gate = QualityGate(period=pd.Period("2021-01", freq="M"))
+
+    assert len(gate.apply(df, no_coercion(df))) == 2
+    assert gate.counts["unknown_pickup_zone"] == 0
+    assert gate.counts["unknown_dropoff_zone"] == 0
+
+
+def test_coerced_values_are_quarantined():
+    raw = pd.DataFrame({"fare_amount": ["12.5", "abc"], "passenger_count": ["1", None]})
+    gate = QualityGate(check_zones=False)
+    raw_notna = gate.snapshot(raw, ["fare_amount", "passenger_count", "not_in_chunk"])
+
+    normalized = raw.assign(fare_amount=pd.to_numeric(raw["fare_amount"], errors="coerce"))
+
+    assert list(gate.coerced_mask(normalized, raw_notna)) == [False, True]
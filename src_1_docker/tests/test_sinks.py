@@ -0,0 +1,357 @@
+import functools
+import io
+import os
+import re
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+import utils
+import zone_enrichment
+from config import PipelineConfig
+from etl_pipeline import etl_pipeline
+from sinks import CsvFileSink, PostgresCopySink, Sink, SinkFanOut
+
+
+YELLOW_CSV = """VendorID,tpep_pickup_datetime,tpep_dropoff_datetime,passenger_count,trip_distance,RatecodeID,\
+store_and_fwd_flag,PULocationID,DOLocationID,payment_type,fare_amount,extra,mta_tax,tip_amount,tolls_amount,\
+improvement_surcharge,total_amount,congestion_surcharge
+1,2021-01-01 00:30:10,2021-01-01 00:36:12,1,2.10,1,N,142,43,2,8,3,0.5,0,0,0.3,11.8,2.5
+2,2021-01-01 00:51:20,2021-01-01 00:52:19,1,0.20,1,N,238,151,2,3,0.5,0.5,0,0,0.3,4.3,0
+"""
+
+# A third trip with a negative fare, which the quality gate quarantines
+YELLOW_CSV_WITH_REJECT = YELLOW_CSV + "2,2021-01-01 01:10:00,2021-01-01 01:20:00,1,1.5,1,N,238,151,2,-6,0,0.5,0,0,0.3,-5.2,0\n"
+
+
+class RecordingSink(Sink):
+
+    def __init__(self, name: str, fail_on_write: bool = False, destination: bool = True):
+        super().__init__()
+        self.name = name
+        self.destination = destination
+        self.fail_on_write = fail_on_write
+        self.frames = []
+        self.closed = False
+        self.aborted = False
+
+    def _write(self, df):
+        if self.fail_on_write:
+            raise IOError(f"{self.name} is down")
+        self.frames.append(df)
+
+    def _close(self):
+        self.closed = True
+
+    def _abort(self):
+        self.aborted = True
+
+
+class FakePostgres:
+    """Stands in for psycopg2; records the statements of every connection in ``log``.
+
+    Column lookups are answered from ``tables`` (unknown tables have no columns) and
+    are not logged; the column list of every COPY is kept in ``copied_columns``.
+    """
+
+    Error = Exception
+
+    def __init__(self):
+        self.log = []
+        self.tables = {}
+        self.copied_columns = []
+        self.fail_copy = False
+        self.extras = types.SimpleNamespace(
+            execute_batch=lambda cursor, sql, values, page_size: self.log.append(("upsert", len(values))))
+
+    def connect(self, **kwargs):
+        return FakeConnection(self)
+
+
+class FakeCursor:
+
+    def __init__(self, server: FakePostgres):
+        self.server = server
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def execute(self, sql, params=None):
+        if "information_schema.columns" in sql:
+            self.rows = [(col,) for col in self.server.tables.get(params[0], [])]
+            return
+        # e.g. ("execute", "DELETE FROM yellow_taxi_data")
+        self.server.log.append(("execute", " ".join(sql.split()[:3])))
+        self.rowcount = 0
+
+    def fetchall(self):
+        return self.rows
+
+    def copy_expert(self, sql, buffer):
+        if self.server.fail_copy:
+            raise IOError("connection reset")
+        self.server.copied_columns.append(sql[sql.index("(") + 1:sql.index(")")].split(","))
+        self.server.log.append(("copy", sum(1 for _ in buffer)))
+
+
+class FakeConnection:
+
+    def __init__(self, server: FakePostgres):
+        self.server = server
+
+    def cursor(self):
+        return FakeCursor(self.server)
+
+    def commit(self):
+        self.server.log.append("commit")
+
+    def rollback(self):
+        self.server.log.append("rollback")
+
+    def close(self):
+        self.server.log.append("close")
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    server = FakePostgres()
+    monkeypatch.setitem(sys.modules, "psycopg2", server)
+    monkeypatch.setitem(sys.modules, "psycopg2.extras", server.extras)
+    return server
+
+
+def chunk(n: int = 3) -> pd.DataFrame:
+    return pd.DataFrame({"trip_id": range(n), "fare_amount": [10.0] * n})
+
+
+def test_fan_out_isolates_a_failing_destination():
+    healthy = RecordingSink("csv")
+    broken = RecordingSink("postgres", fail_on_write=True)
+    fan_out = SinkFanOut([healthy, broken])
+
+    fan_out.write(chunk())
+    fan_out.write(chunk())
+    written = fan_out.close()
+
+    assert written == {"csv": 6}
+    assert healthy.closed and len(healthy.frames) == 2
+    assert broken.aborted
+    assert list(fan_out.failed_destinations) == ["postgres"]
+
+
+def test_fan_out_raises_when_every_destination_failed():
+    fan_out = SinkFanOut([RecordingSink("postgres", fail_on_write=True), RecordingSink("csv", fail_on_write=True)])
+
+    with pytest.raises(RuntimeError, match="All destination sinks failed"):
+        fan_out.write(chunk())
+
+
+def test_auxiliary_sinks_do_not_mask_a_failed_load():
+    sketches = RecordingSink("sketches", destination=False)
+    fan_out = SinkFanOut([RecordingSink("postgres", fail_on_write=True), sketches])
+
+    with pytest.raises(RuntimeError):
+        fan_out.write(chunk())
+    assert len(sketches.frames) == 1
+
+
+def test_derived_sinks_are_discarded_when_a_destination_fails_on_close():
+    class FailingClose(RecordingSink):
+        def _close(self):
+            raise IOError("commit failed")
+
+    sketches = RecordingSink("sketches", destination=False)
+    fan_out = SinkFanOut([sketches, FailingClose("postgres"), RecordingSink("csv")])
+
+    fan_out.write(chunk())
+    written = fan_out.close()
+
+    assert written == {"csv": 3}
+    assert sketches.aborted and not sketches.closed
+
+
+def test_successful_close_does_not_report_failures():
+    fan_out = SinkFanOut([RecordingSink("postgres"), RecordingSink("sketches", destination=False)])
+
+    fan_out.write(chunk())
+
+    assert fan_out.close() == {"postgres": 3, "sketches": 3}
+    assert fan_out.failed_destinations == {}
+
+
+def test_csv_sink_only_publishes_on_close(tmp_path):
+    path = tmp_path / "out.csv.gz"
+    sink = CsvFileSink(str(path))
+
+    sink.write(chunk())
+    assert not path.exists()
+    sink.close()
+
+    assert pd.read_csv(path)["trip_id"].tolist() == [0, 1, 2]
+
+
+def test_csv_sink_abort_leaves_nothing_behind(tmp_path):
+    sink = CsvFileSink(str(tmp_path / "out.csv"))
+
+    sink.write(chunk())
+    sink.abort()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_postgres_sink_commits_batches_and_hooks_on_close(postgres):
+    on_batch = lambda cursor, df: postgres.log.append(("rollup", len(df)))
+    sink = PostgresCopySink({}, "yellow_taxi_data", buffer_rows=2, on_batch=on_batch)
+
+    sink.write(chunk(2))
+    sink.write(chunk(1))
+    sink.close()
+
+    assert postgres.log == [("copy", 2), ("rollup", 2), ("copy", 1), ("rollup", 1), "commit", "close"]
+
+
+def test_postgres_sink_begin_hook_runs_once_per_transaction(postgres):
+    on_begin = lambda cursor: cursor.execute("DELETE FROM yellow_taxi_data WHERE ...")
+    sink = PostgresCopySink({}, "yellow_taxi_data", buffer_rows=2, on_begin=on_begin)
+
+    sink.write(chunk(2))
+    sink.write(chunk(2))
+    sink.close()
+
+    assert postgres.log == [("execute", "DELETE FROM yellow_taxi_data"), ("copy", 2), ("copy", 2), "commit", "close"]
+
+
+def test_postgres_sink_begin_hook_runs_without_rows(postgres):
+    # A reload that yields no rows still replaces the previous load
+    sink = PostgresCopySink({}, "yellow_taxi_data", on_begin=lambda cursor: cursor.execute("DELETE FROM x"))
+
+    sink.close()
+
+    assert postgres.log == [("execute", "DELETE FROM x"), "commit", "close"]
+
+
+def test_postgres_sink_copies_only_the_table_columns(postgres):
+    postgres.tables["yellow_taxi_data"] = ["trip_id", "fare_amount"]
+    batches = []
+    sink = PostgresCopySink({}, "yellow_taxi_data", on_batch=lambda cursor, df: batches.append(df))
+
+    sink.write(chunk(2).assign(airport_fee=1.75, cbd_congestion_fee=0.75))
+    sink.close()
+
+    assert postgres.copied_columns == [["trip_id", "fare_amount"]]
+    assert "airport_fee" in batches[0].columns
+
+
+def test_postgres_sink_rolls_back_copied_batches_on_abort(postgres):
+    sink = PostgresCopySink({}, "yellow_taxi_data", buffer_rows=2)
+
+    sink.write(chunk(2))
+    sink.abort()
+
+    assert postgres.log == [("copy", 2), "rollback", "close"]
+
+
+def test_run_fails_when_one_destination_failed(postgres, tmp_path):
+    postgres.fail_copy = True
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "yellow_tripdata_2021-01.csv").write_text(YELLOW_CSV)
+    config = PipelineConfig(sinks=["postgres", "csv"], source_cache_dir=str(cache_dir),
+                            csv_output_dir=str(tmp_path / "csv"), quality_checks=False, rollup_granularity=None)
+
+    with pytest.raises(RuntimeError, match="Destinations failed .*postgres"):
+        etl_pipeline("https://host/yellow_tripdata_2021-01.csv", "yellow", "yellow_taxi_data", "csv", config)
+
+    # The healthy destination still committed its output
+    assert os.listdir(tmp_path / "csv") == ["yellow_tripdata_2021-01_transformed.csv"]
+    assert postgres.log == [("execute", "DELETE FROM yellow_taxi_data"), "rollback", "close"]
+
+
+def reload(tmp_path, quality_checks: bool = False):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(exist_ok=True)
+    (cache_dir / "yellow_tripdata_2021-01.csv").write_text(YELLOW_CSV_WITH_REJECT if quality_checks else YELLOW_CSV)
+    config = PipelineConfig(sinks=["postgres"], source_cache_dir=str(cache_dir), quality_checks=quality_checks)
+    etl_pipeline("https://host/yellow_tripdata_2021-01.csv", "yellow", "yellow_taxi_data", "csv", config)
+
+
+def test_reload_replaces_trips_and_rollup_in_the_load_transaction(postgres, tmp_path):
+    reload(tmp_path)
+
+    load = postgres.log[postgres.log.index(("execute", "DELETE FROM yellow_taxi_data")):]
+    assert load == [
+        ("execute", "DELETE FROM yellow_taxi_data"),
+        ("execute", "DELETE FROM yellow_taxi_rollup_hour"),
+        ("copy", 2),
+        ("upsert", 2),
+        "commit",
+        "close",
+    ]
+
+
+def test_failed_reload_keeps_the_previous_load(postgres, tmp_path):
+    postgres.fail_copy = True
+
+    with pytest.raises(RuntimeError):
+        reload(tmp_path)
+
+    # Both deletes ran on the load connection, so the rollback undoes them
+    assert postgres.log[-4:] == [
+        ("execute", "DELETE FROM yellow_taxi_data"),
+        ("execute", "DELETE FROM yellow_taxi_rollup_hour"),
+        "rollback",
+        "close",
+    ]
+    assert "commit" not in postgres.log[postgres.log.index(("execute", "DELETE FROM yellow_taxi_data")):]
+
+
+def test_parquet_source_with_newer_fee_columns_loads(postgres, tmp_path):
+    # TLC yellow parquet files carry Airport_fee (and cbd_congestion_fee from 2025),
+    # which the yellow table does not have
+    trip_columns = re.findall(r"^\s*(\w+) [A-Z]", utils.get_yellow_trip_schema(), re.MULTILINE)
+    postgres.tables["yellow_taxi_data"] = trip_columns
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    source = pd.read_csv(io.StringIO(YELLOW_CSV), parse_dates=["tpep_pickup_datetime", "tpep_dropoff_datetime"])
+    source.assign(Airport_fee=0.0, cbd_congestion_fee=0.75).to_parquet(cache_dir / "yellow_tripdata_2021-01.parquet")
+    config = PipelineConfig(sinks=["postgres"], source_cache_dir=str(cache_dir), quality_checks=False,
+                            rollup_granularity=None)
+
+    etl_pipeline("https://host/yellow_tripdata_2021-01.parquet", "yellow", "yellow_taxi_data", "parquet", config)
+
+    assert len(postgres.copied_columns) == 1
+    assert set(postgres.copied_columns[0]) <= set(trip_columns)
+    assert postgres.log[-3:] == [("copy", 2), "commit", "close"]
+
+
+@pytest.fixture
+def zone_lookup(tmp_path, monkeypatch):
+    path = tmp_path / "taxi_zone_lookup.csv"
+    path.write_text("LocationID,Borough,Zone,service_zone\n" + "".join(
+        f"{zone},Manhattan,Zone {zone},Yellow Zone\n" for zone in (43, 142, 151, 238)))
+    monkeypatch.setattr(zone_enrichment, "get_zone_lookup",
+                        functools.partial(zone_enrichment.get_zone_lookup, path=str(path)))
+
+
+def test_quarantine_is_replaced_in_its_own_load_transaction(postgres, tmp_path, zone_lookup):
+    reload(tmp_path, quality_checks=True)
+
+    quarantine = postgres.log[postgres.log.index(("execute", "DELETE FROM yellow_taxi_data_quarantine")):]
+    assert quarantine == [("execute", "DELETE FROM yellow_taxi_data_quarantine"), ("copy", 1), "commit", "close"]
+
+
+def test_failed_reload_keeps_the_previous_quarantine(postgres, tmp_path, zone_lookup):
+    postgres.fail_copy = True
+
+    with pytest.raises(RuntimeError):
+        reload(tmp_path, quality_checks=True)
+
+    assert ("execute", "DELETE FROM yellow_taxi_data_quarantine") not in postgres.log
@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sinks import Sink, SinkFanOut
+from sketches import HyperLogLog, QuantileSketch, SketchSink, TripSketches, get_sketch_path, merge_sketches
+
+
+class FailingSink(Sink):
+    name = "postgres"
+
+    def _write(self, df):
+        raise IOError("connection reset")
+
+
+class NullSink(Sink):
+    name = "csv"
+
+    def _write(self, df):
+        pass
+
+
+@pytest.fixture
+def fares():
+    return np.random.default_rng(7).lognormal(mean=2.5, sigma=0.8, size=200_000)
+
+
+def trips(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "fare_amount": rng.lognormal(2.5, 0.8, n),
+        "tip_amount": rng.exponential(2.0, n),
+        "total_amount": rng.lognormal(2.8, 0.7, n),
+        "trip_distance_miles": rng.exponential(3.0, n),
+        "trip_duration_secs": pd.array(rng.integers(60, 3600, n), dtype="Int64"),
+        "pickup_location_id": pd.array(rng.integers(1, 266, n), dtype="Int64"),
+        "dropoff_location_id": pd.array(rng.integers(1, 266, n), dtype="Int64"),
+        "vendor_id": pd.array(rng.integers(1, 3, n), dtype="Int64"),
+    })
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.9, 0.99])
+def test_quantiles_are_within_the_relative_accuracy(fares, q):
+    sketch = QuantileSketch()
+    sketch.update(fares)
+
+    exact = np.quantile(fares, q, method="lower")
+
+    assert sketch.quantile(q) == pytest.approx(exact, rel=QuantileSketch.RELATIVE_ACCURACY)
+
+
+def test_quantiles_handle_negatives_zeros_and_nans():
+    sketch = QuantileSketch()
+    sketch.update(np.array([-50.0, -5.0, 0.0, 0.0, np.nan, 5.0, 50.0]))
+
+    assert sketch.count == 6
+    assert sketch.quantile(0) == pytest.approx(-50.0, rel=QuantileSketch.RELATIVE_ACCURACY)
+    assert sketch.quantile(0.2) == pytest.approx(-5.0, rel=QuantileSketch.RELATIVE_ACCURACY)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1) == pytest.approx(50.0, rel=QuantileSketch.RELATIVE_ACCURACY)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_merged_quantile_sketch_equals_one_pass(fares):
+    whole = QuantileSketch()
+    whole.update(fares)
+    left, right = QuantileSketch(), QuantileSketch()
+    left.update(fares[:50_000])
+    right.update(fares[50_000:])
+
+    left.merge(right)
+
+    assert np.array_equal(left.positive, whole.positive)
+    assert left.quantile(0.95) == whole.quantile(0.95)
+
+
+@pytest.mark.parametrize("n", [1_000, 1_000_000])
+def test_distinct_count_error(n):
+    hll = HyperLogLog()
+    hll.update(pd.DataFrame({"id": np.arange(n)}))
+
+    # The standard error at precision 14 is 1.04 / sqrt(2**14) ~ 0.8%
+    assert hll.estimate() == pytest.approx(n, rel=0.02)
+
+
+def test_distinct_count_ignores_duplicates_and_nulls():
+    hll = HyperLogLog()
+    hll.update(pd.DataFrame({"pu": pd.array([1, 1, 2, None], dtype="Int64"), "do": pd.array([5, 5, 5, 5], dtype="Int64")}))
+
+    assert hll.estimate() == 2
+
+
+def test_merged_hll_matches_the_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(pd.DataFrame({"id": np.arange(0, 60_000)}))
+    right.update(pd.DataFrame({"id": np.arange(40_000, 100_000)}))
+    union.update(pd.DataFrame({"id": np.arange(0, 100_000)}))
+
+    left.merge(right)
+
+    assert np.array_equal(left.registers, union.registers)
+
+
+def test_sketches_round_trip_and_merge_by_month(tmp_path):
+    for month, seed in ((1, 1), (2, 2)):
+        sketches = TripSketches()
+        sketches.update(trips(10_000, seed))
+        sketches.save(get_sketch_path("yellow", f"yellow_tripdata_2021-{month:02d}.parquet", str(tmp_path)))
+
+    january = TripSketches()
+    january.update(trips(10_000, 1))
+    loaded = merge_sketches("yellow", 2021, 1, sketch_dir=str(tmp_path))
+
+    assert loaded.quantile("fare_amount", 0.5) == january.quantile("fare_amount", 0.5)
+    assert loaded.distinct_count("routes") == january.distinct_count("routes")
+
+    year = merge_sketches("yellow", 2021, sketch_dir=str(tmp_path))
+    assert year.quantiles["trip_duration_secs"].count == 20_000
+    assert year.distinct_count("vendors") == 2
+
+    with pytest.raises(FileNotFoundError):
+        merge_sketches("green", 2021, sketch_dir=str(tmp_path))
+
+
+def test_sketches_are_not_saved_for_a_failed_load(tmp_path):
+    path = get_sketch_path("yellow", "yellow_tripdata_2021-01.parquet", str(tmp_path))
+    fan_out = SinkFanOut([FailingSink(), NullSink(), SketchSink(path)])
+
+    fan_out.write(trips(100, 1))
+    written = fan_out.close()
+
+    assert list(fan_out.failed_destinations) == ["postgres"]
+    assert "sketches" not in written
+    assert not os.path.exists(path)
+
+
+def test_sketches_are_saved_once_the_load_succeeded(tmp_path):
+    path = get_sketch_path("yellow", "yellow_tripdata_2021-01.parquet", str(tmp_path))
+    fan_out = SinkFanOut([SketchSink(path)])
+
+    fan_out.write(trips(100, 1))
+    fan_out.close()
+
+    assert TripSketches.load(path).quantiles["fare_amount"].count == 100
@@ -1,10 +1,10 @@
 import pandas as pd
+import io
 import os
-from sqlalchemy import text
 import logging
-import psycopg2
 from typing import Iterator, Dict, Any
-from psycopg2.extras import execute_batch
+
+# psycopg2 is imported inside the helpers so importing utils never loads the driver
 
 
 logging.basicConfig(level=logging.INFO)
@@ -76,6 +76,124 @@ def get_green_trip_schema() -> str:
     return schema_sql
 
 
+def get_rollup_schema(table_name: str) -> str:
+    """Returns the SQL schema for a pre-aggregated trip rollup table.
+
+    Rows are keyed by the source file they were computed from, so reloading a month
+    can clear exactly its own contribution before adding the new aggregates.
+    """
+
+    schema_sql = f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        source_file TEXT NOT NULL,
+        bucket_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        pickup_location_id INTEGER NOT NULL,
+        payment_type INTEGER NOT NULL,
+        trip_count BIGINT NOT NULL,
+        fare_amount_sum FLOAT(53),
+        tip_amount_sum FLOAT(53),
+        trip_distance_miles_sum FLOAT(53),
+        PRIMARY KEY (source_file, bucket_start, pickup_location_id, payment_type)
+    )
+    """
+
+    return schema_sql
+
+
+def get_quarantine_schema(table_name: str) -> str:
+    """Returns the SQL creating the quarantine table of a trip table.
+
+    It mirrors the trip table's columns and adds the source file and the
+    '|'-separated reason codes of the rules each row failed.
+    """
+
+    schema_sql = f"""
+    CREATE TABLE IF NOT EXISTS {table_name}_quarantine (LIKE {table_name});
+    ALTER TABLE {table_name}_quarantine
+        ADD COLUMN IF NOT EXISTS source_file TEXT,
+        ADD COLUMN IF NOT EXISTS reason_codes TEXT;
+    """
+
+    return schema_sql
+
+
+def get_zone_columns_sql(table_name: str) -> str:
+    """Returns the SQL adding the zone enrichment columns to a trip table."""
+
+    schema_sql = f"""
+    ALTER TABLE {table_name}
+        ADD COLUMN IF NOT EXISTS pickup_borough TEXT,
+        ADD COLUMN IF NOT EXISTS pickup_zone TEXT,
+        ADD COLUMN IF NOT EXISTS dropoff_borough TEXT,
+        ADD COLUMN IF NOT EXISTS dropoff_zone TEXT
+    """
+
+    return schema_sql
+
+
+def get_cluster_indexes_sql(table_name: str) -> str:
+    """Returns the SQL creating the time-range and location indexes of a trip table.
+
+    BRIN indexes stay tiny and only pay off when rows are physically ordered by
+    time, so they are meant for tables loaded with sorted batches.
+    """
+
+    schema_sql = f"""
+    CREATE INDEX IF NOT EXISTS {table_name}_pickup_datetime_brin
+        ON {table_name} USING brin (pickup_datetime) WITH (pages_per_range = 32, autosummarize = on);
+    CREATE INDEX IF NOT EXISTS {table_name}_dropoff_datetime_brin
+        ON {table_name} USING brin (dropoff_datetime) WITH (pages_per_range = 32, autosummarize = on);
+    CREATE INDEX IF NOT EXISTS {table_name}_location_ids_idx
+        ON {table_name} (pickup_location_id, dropoff_location_id);
+    CREATE INDEX IF NOT EXISTS {table_name}_dropoff_location_id_idx
+        ON {table_name} (dropoff_location_id);
+    """
+
+    return schema_sql
+
+
+def get_index_maintenance_sql(table_name: str) -> str:
+    """Returns the SQL summarizing newly loaded block ranges and refreshing planner statistics."""
+
+    schema_sql = f"""
+    SELECT brin_summarize_new_values('{table_name}_pickup_datetime_brin');
+    SELECT brin_summarize_new_values('{table_name}_dropoff_datetime_brin');
+    ANALYZE {table_name};
+    """
+
+    return schema_sql
+
+
+def execute_sql(db_config: Dict[str, Any], sql: str):
+    """
+    Execute a DDL/maintenance statement in its own transaction.
+    
+    Args:
+        db_config: Database connection configuration
+        sql: SQL statement
+    """
+    import psycopg2
+
+    conn = None
+    cursor = None
+    
+    try:
+        conn = psycopg2.connect(**db_config)
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        conn.commit()
+    except psycopg2.Error as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Database error: {e}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 def create_table_if_not_exists(db_config: Dict[str, Any], table_name: str, schema: str):
     """
     Create PostgreSQL table if it doesn't exist.
@@ -85,6 +203,8 @@ def create_table_if_not_exists(db_config: Dict[str, Any], table_name: str, schem
         table_name: Table name
         schema: CREATE TABLE SQL statement
     """
+    import psycopg2
+
     conn = None
     cursor = None
     
@@ -115,6 +235,9 @@ def load_to_postgres(df: pd.DataFrame, db_config: Dict[str, Any], table_name: st
     """
     logger.info(f"Loading {len(df)} rows to PostgreSQL table '{table_name}'")
     
+    import psycopg2
+    from psycopg2.extras import execute_batch
+
     conn = None
     cursor = None
     
@@ -154,6 +277,101 @@ def load_to_postgres(df: pd.DataFrame, db_config: Dict[str, Any], table_name: st
             conn.close()
 
 
+def copy_frame(cursor, df: pd.DataFrame, table_name: str):
+    """
+    COPY a DataFrame into a table on an open cursor, leaving the commit to the caller.
+    
+    Args:
+        cursor: psycopg2 cursor of the load transaction
+        df: Rows to copy; column names must match the table
+        table_name: Target table name
+    """
+    # Unquoted empty fields are read back as NULL
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    column_names = ','.join(df.columns)
+    cursor.copy_expert(f"COPY {table_name} ({column_names}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def get_table_columns(cursor, table_name: str) -> list:
+    """
+    List the columns of a table in the current schema, or none if the table does not exist.
+
+    Args:
+        cursor: psycopg2 cursor
+        table_name: Table name
+    """
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+        (table_name,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def clear_source_file_rows(cursor, table_name: str, source_file: str):
+    """
+    Remove the rows a source file previously contributed to a rollup or quarantine table,
+    on an open cursor so the delete commits or rolls back with the reload.
+    
+    Args:
+        cursor: psycopg2 cursor of the load transaction
+        table_name: Table keyed by source_file
+        source_file: File name the rows were derived from
+    """
+    cursor.execute(f"DELETE FROM {table_name} WHERE source_file = %s", (source_file,))
+    logger.info(f"Cleared {cursor.rowcount} rows of '{source_file}' from '{table_name}'")
+
+
+def clear_pickup_range_rows(cursor, table_name: str, start, end):
+    """
+    Remove the trips picked up in [start, end) on an open cursor, leaving the commit to the caller.
+    
+    Args:
+        cursor: psycopg2 cursor of the load transaction
+        table_name: Trip table name
+        start: First pickup time to delete
+        end: Pickup time (exclusive) the range ends at
+    """
+    cursor.execute(
+        f"DELETE FROM {table_name} WHERE pickup_datetime >= %s AND pickup_datetime < %s",
+        (start.to_pydatetime(), end.to_pydatetime()),
+    )
+    logger.info(f"Cleared {cursor.rowcount} rows picked up in [{start}, {end}) from '{table_name}'")
+
+
+def upsert_rollup_rows(cursor, df: pd.DataFrame, table_name: str, key_columns: list):
+    """
+    Additively upsert partial aggregates on an open cursor, leaving the commit to the caller.
+    
+    Args:
+        cursor: psycopg2 cursor of the load transaction
+        df: Partial aggregates
+        table_name: Rollup table name
+        key_columns: Primary key columns of the rollup table
+    """
+    from psycopg2.extras import execute_batch
+
+    df = df.astype(object).where(pd.notna(df), None)
+
+    columns = df.columns.tolist()
+    values = df.to_numpy(dtype=object).tolist()
+    measure_columns = [col for col in columns if col not in key_columns]
+
+    placeholders = ','.join(['%s'] * len(columns))
+    updates = ','.join(
+        f"{col} = COALESCE({table_name}.{col}, 0) + COALESCE(EXCLUDED.{col}, 0)" for col in measure_columns
+    )
+    upsert_query = (
+        f"INSERT INTO {table_name} ({','.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({','.join(key_columns)}) DO UPDATE SET {updates}"
+    )
+
+    execute_batch(cursor, upsert_query, values, page_size=1000)
+
+
 def simple_load(engine, dataframe: pd.DataFrame, table_name: str, if_exists: str="replace"):
     """
     Loads a pandas DataFrame into a PostgreSQL database table.      
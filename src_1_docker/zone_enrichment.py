@@ -0,0 +1,142 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+ZONE_URL = "https://d37ci6vzurychx.cloudfront.net/misc/taxi_zone_lookup.csv"
+ZONE_FILE = os.path.join(parent_dir, "data", "taxi_zone_lookup.csv")
+
+ZONE_ATTRIBUTES = {
+    "borough": "Borough",
+    "zone": "Zone",
+    "service_zone": "service_zone",
+}
+
+
+class ZoneLookup:
+    """Dense, LocationID-indexed arrays of categorical codes for the taxi zone lookup.
+
+    ``codes[attr][location_id]`` is the position of the zone's value in
+    ``categories[attr]``, or -1 when the LocationID is not in the lookup or the
+    value is missing. ``known[location_id]`` says whether the LocationID is listed.
+    """
+
+    def __init__(self, df_zone: pd.DataFrame, signature: tuple):
+        location_ids = df_zone["LocationID"].to_numpy(dtype="int64")
+        size = int(location_ids.max()) + 1
+
+        self.signature = signature
+        self.known = np.zeros(size, dtype=bool)
+        self.known[location_ids] = True
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, pd.Index] = {}
+
+        for attr, source_col in ZONE_ATTRIBUTES.items():
+            value_codes, categories = pd.factorize(df_zone[source_col])
+            dense = np.full(size, -1, dtype=np.int16)
+            dense[location_ids] = value_codes
+            self.codes[attr] = dense
+            self.categories[attr] = categories
+
+    def lookup(self, location_ids: pd.Series, attr: str) -> pd.Categorical:
+        """Maps a LocationID column to a categorical of ``attr`` with pure array indexing."""
+
+        dense = self.codes[attr]
+        ids = location_ids.to_numpy(dtype="float64", na_value=-1).astype("int64")
+        in_range = (ids >= 0) & (ids < len(dense))
+        codes = np.where(in_range, dense[np.where(in_range, ids, 0)], -1)
+
+        return pd.Categorical.from_codes(codes, categories=self.categories[attr])
+
+    def is_known(self, location_ids: pd.Series) -> np.ndarray:
+        """Boolean mask of LocationIDs present in the lookup (nulls are unknown)."""
+
+        ids = location_ids.to_numpy(dtype="float64", na_value=-1).astype("int64")
+        in_range = (ids >= 0) & (ids < len(self.known))
+
+        return in_range & self.known[np.where(in_range, ids, 0)]
+
+
+_cache: Optional[ZoneLookup] = None
+_cache_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def download_zone_file(url: str = ZONE_URL, path: str = ZONE_FILE) -> str:
+    """Downloads the zone lookup CSV to the local data directory.
+
+    The file is written to a process-unique temp file and renamed into place, so
+    concurrent backfill workers never read a half-written lookup.
+    """
+
+    import requests
+
+    logger.info(f"Downloading zone lookup from {url}")
+    response = requests.get(url)
+    response.raise_for_status()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return path
+
+
+def get_zone_lookup(path: str = ZONE_FILE) -> ZoneLookup:
+    """
+    Return the process-wide zone lookup, rebuilding it only when the lookup file changes.
+
+    Args:
+        path: Local path of taxi_zone_lookup.csv (downloaded on first use if missing)
+
+    Returns:
+        The cached ZoneLookup
+    """
+    global _cache
+
+    with _cache_lock:
+        if not os.path.exists(path):
+            download_zone_file(path=path)
+
+        signature = (path,) + _file_signature(path)
+        if _cache is None or _cache.signature != signature:
+            # 'N/A' is a real value in the lookup (e.g. zone 265's borough); only empty fields are missing
+            _cache = ZoneLookup(pd.read_csv(path, keep_default_na=False, na_values=[""]), signature)
+            logger.info(f"Zone lookup cache built from {path} ({len(_cache.codes['borough'])} slots)")
+
+        return _cache
+
+
+def enrich_zones(df: pd.DataFrame, path: str = ZONE_FILE) -> pd.DataFrame:
+    """Adds pickup/dropoff borough and zone columns to a transformed trip chunk."""
+
+    zones = get_zone_lookup(path)
+
+    for prefix in ("pickup", "dropoff"):
+        location_col = f"{prefix}_location_id"
+        if location_col not in df.columns:
+            continue
+        df[f"{prefix}_borough"] = zones.lookup(df[location_col], "borough")
+        df[f"{prefix}_zone"] = zones.lookup(df[location_col], "zone")
+
+    return df
@@ -1,11 +1,9 @@
 import pandas as pd
-import requests
-from io import StringIO, BytesIO
 from typing import Iterator, Dict, Any
 from kestra import Kestra
-import gzip
 import argparse
-import pyarrow.parquet as pq
+
+# pyarrow is imported only for parquet inputs; the container starts fresh for every task
 
 
 # Configure logging
@@ -55,7 +53,9 @@ def extract_parquet_chunks(pqtfile, chunk_size: int = CHUNK_SIZE) -> Iterator[pd
     Yields:
         DataFrame chunks
     """
-    logger.info(f"Starting Parquet extraction from {url}")
+    import pyarrow.parquet as pq
+
+    logger.info(f"Starting Parquet extraction from {pqtfile}")
     
     try:        
         # Read Parquet file
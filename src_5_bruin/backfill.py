@@ -0,0 +1,174 @@
+import argparse
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Dict, List
+
+import duckdb
+
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline", "assets")
+
+# Incremental SQL assets in dependency order: (target table, asset file, incremental key).
+# Within one interval they run sequentially; separate intervals run in parallel.
+INCREMENTAL_ASSETS = [
+    ("staging.trips", os.path.join(ASSETS_DIR, "staging", "staging_trips.sql"), "pickup_date"),
+    ("reports.trips_report", os.path.join(ASSETS_DIR, "reports", "trips.sql"), "pickup_date"),
+]
+
+BRUIN_HEADER = re.compile(r"/\*\s*@bruin.*?@bruin\s*\*/", re.DOTALL)
+TEMPLATE_VAR = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill the incremental Bruin SQL assets in parallel.")
+    parser.add_argument("--duckdb-path", required=True)
+    parser.add_argument("--start-date", required=True, type=date.fromisoformat)
+    parser.add_argument("--end-date", required=True, type=date.fromisoformat, help="Exclusive")
+    parser.add_argument("--interval", choices=["day", "month"], default="day")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    return parser.parse_args()
+
+
+def load_asset_query(path: str) -> str:
+    """Reads a Bruin SQL asset and strips its @bruin header."""
+
+    with open(path) as f:
+        return BRUIN_HEADER.sub("", f.read()).strip()
+
+
+def render_query(query: str, start: date, end: date) -> str:
+    """Substitutes the Bruin interval variables for a single [start, end) run."""
+
+    values = {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "start_datetime": f"{start.isoformat()} 00:00:00",
+        "end_datetime": f"{end.isoformat()} 00:00:00",
+    }
+
+    return TEMPLATE_VAR.sub(lambda m: values[m.group(1)], query)
+
+
+def build_intervals(start: date, end: date, interval: str) -> List[tuple[date, date]]:
+    """Splits [start, end) into daily or monthly [start, end) intervals."""
+
+    intervals = []
+    current = start
+    while current < end:
+        if interval == "day":
+            nxt = current + timedelta(days=1)
+        else:
+            nxt = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        intervals.append((current, min(nxt, end)))
+        current = nxt
+
+    return intervals
+
+
+def ensure_tables(con: duckdb.DuckDBPyConnection, queries: Dict[str, str], start: date, end: date):
+    """Creates empty target tables up front so parallel intervals never race on CREATE."""
+
+    for table, _, _ in INCREMENTAL_ASSETS:
+        schema = table.split(".")[0]
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        con.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} AS "
+            f"SELECT * FROM ({render_query(queries[table], start, end)}) LIMIT 0"
+        )
+
+
+def run_interval(con: duckdb.DuckDBPyConnection, queries: Dict[str, str], start: date, end: date) -> Dict[str, int]:
+    """
+    Recompute one interval of every incremental asset with delete+insert.
+
+    Each asset runs in its own transaction on a dedicated cursor, so concurrent intervals
+    only touch disjoint incremental-key ranges of the same tables.
+    """
+    cursor = con.cursor()
+    inserted = {}
+
+    try:
+        for table, _, incremental_key in INCREMENTAL_ASSETS:
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE {incremental_key} >= ? AND {incremental_key} < ?",
+                    [start, end],
+                )
+                cursor.execute(f"INSERT INTO {table} {render_query(queries[table], start, end)}")
+                inserted[table] = cursor.fetchone()[0]
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        cursor.close()
+
+    return inserted
+
+
+def backfill(duckdb_path: str, start: date, end: date, interval: str = "day", workers: int = 4):
+    """
+    Backfill the incremental assets over [start, end), running intervals in parallel.
+
+    Args:
+        duckdb_path: Path of the DuckDB database used by the pipeline
+        start: First date to recompute
+        end: Exclusive end date
+        interval: 'day' or 'month' interval size
+        workers: Number of intervals recomputed concurrently
+    """
+    queries = {table: load_asset_query(path) for table, path, _ in INCREMENTAL_ASSETS}
+    intervals = build_intervals(start, end, interval)
+    logger.info(f"Backfilling {len(intervals)} {interval} intervals from {start} to {end} with {workers} workers")
+
+    con = duckdb.connect(duckdb_path)
+    failed = []
+
+    try:
+        ensure_tables(con, queries, start, end)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run_interval, con, queries, interval_start, interval_end): (interval_start, interval_end)
+                for interval_start, interval_end in intervals
+            }
+            for future in as_completed(futures):
+                interval_start, interval_end = futures[future]
+                try:
+                    inserted = future.result()
+                    logger.info(f"Interval [{interval_start}, {interval_end}) done: {inserted}")
+                except Exception as e:
+                    logger.error(f"Interval [{interval_start}, {interval_end}) failed: {e}")
+                    failed.append((interval_start, interval_end))
+    finally:
+        con.close()
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(intervals)} intervals failed: {sorted(failed)}")
+
+    logger.info("Backfill completed successfully")
+
+
+def main():
+
+    args = parse_args()
+    backfill(
+        duckdb_path=args.duckdb_path,
+        start=args.start_date,
+        end=args.end_date,
+        interval=args.interval,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+
+    main()
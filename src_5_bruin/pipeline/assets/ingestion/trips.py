@@ -0,0 +1,328 @@
+""" @bruin
+name: ingestion.trips_raw
+type: python
+image: python:3.13
+
+secrets:
+  - key: duckdb-default
+    inject_as: duckdb_default
+
+columns:
+  - name: taxi_type
+    type: string
+    description: "Taxi type the row was ingested for (yellow, green, fhv)"
+    checks:
+      - name: not_null
+  - name: vendor_id
+    type: integer
+  - name: pickup_datetime
+    type: timestamp
+    checks:
+      - name: not_null
+  - name: dropoff_datetime
+    type: timestamp
+  - name: passenger_count
+    type: integer
+  - name: trip_distance
+    type: double
+  - name: pickup_location_id
+    type: integer
+  - name: dropoff_location_id
+    type: integer
+  - name: payment_type
+    type: integer
+  - name: fare_amount
+    type: double
+  - name: tip_amount
+    type: double
+  - name: total_amount
+    type: double
+  - name: extracted_at
+    type: timestamp
+@bruin """
+
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import requests
+
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration
+BATCH_SIZE = 100_000
+DOWNLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+PARQUET_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/"
+CSV_URL = "https://github.com/DataTalksClub/nyc-tlc-data/releases/download/"
+
+# Monthly files are immutable once published, so every daily run of a month reuses one download
+SOURCE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "nyc_taxi_sources")
+
+TARGET_TABLE = "ingestion.trips_raw"
+
+# Target column -> (arrow type, source column candidates across yellow/green/fhv files).
+# Mirrors the rename map in etl_pipeline.transform_data, but keeps the raw distance name
+# that staging.trips selects. It is copied rather than imported because the asset runs in
+# Bruin's own image with only this folder's requirements, and etl_pipeline is pandas-based
+# and yellow/green only.
+TRIPS_RAW_COLUMNS = {
+    "vendor_id": (pa.int64(), ["VendorID"]),
+    "pickup_datetime": (pa.timestamp("us"), ["tpep_pickup_datetime", "lpep_pickup_datetime", "pickup_datetime"]),
+    "dropoff_datetime": (pa.timestamp("us"), ["tpep_dropoff_datetime", "lpep_dropoff_datetime", "dropOff_datetime", "dropoff_datetime"]),
+    "passenger_count": (pa.int64(), ["passenger_count"]),
+    "trip_distance": (pa.float64(), ["trip_distance"]),
+    "pickup_location_id": (pa.int64(), ["PULocationID", "PUlocationID"]),
+    "dropoff_location_id": (pa.int64(), ["DOLocationID", "DOlocationID"]),
+    "payment_type": (pa.int64(), ["payment_type"]),
+    "fare_amount": (pa.float64(), ["fare_amount"]),
+    "tip_amount": (pa.float64(), ["tip_amount"]),
+    "total_amount": (pa.float64(), ["total_amount"]),
+}
+
+TRIPS_RAW_SCHEMA = pa.schema(
+    [pa.field("taxi_type", pa.string())]
+    + [pa.field(name, dtype) for name, (dtype, _) in TRIPS_RAW_COLUMNS.items()]
+    + [pa.field("extracted_at", pa.timestamp("us"))]
+)
+
+CREATE_TRIPS_RAW_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TARGET_TABLE} (
+    taxi_type           VARCHAR,
+    vendor_id           BIGINT,
+    pickup_datetime     TIMESTAMP,
+    dropoff_datetime    TIMESTAMP,
+    passenger_count     BIGINT,
+    trip_distance       DOUBLE,
+    pickup_location_id  BIGINT,
+    dropoff_location_id BIGINT,
+    payment_type        BIGINT,
+    fare_amount         DOUBLE,
+    tip_amount          DOUBLE,
+    total_amount        DOUBLE,
+    extracted_at        TIMESTAMP
+)
+"""
+
+
+def get_run_window() -> tuple[datetime, datetime]:
+    """Returns the [start, end) interval Bruin is running this asset for."""
+
+    start = datetime.fromisoformat(os.environ["BRUIN_START_DATETIME"])
+    end = datetime.fromisoformat(os.environ["BRUIN_END_DATETIME"])
+
+    return start, end
+
+
+def get_pipeline_vars() -> Dict:
+    """Returns the pipeline variables declared in pipeline.yml."""
+
+    return json.loads(os.environ.get("BRUIN_VARS", "{}"))
+
+
+def get_duckdb_path() -> str:
+    """Returns the DuckDB file path of the injected duckdb-default connection."""
+
+    return json.loads(os.environ["duckdb_default"])["path"]
+
+
+def months_in_window(start: datetime, end: datetime) -> List[tuple[int, int]]:
+    """Lists the (year, month) pairs whose monthly file overlaps [start, end)."""
+
+    months = []
+    year, month = start.year, start.month
+    while datetime(year, month, 1) < end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    return months
+
+
+def get_tripdata_url(taxi_type: str, year: int, month: int, source_format: str = 'parquet') -> str:
+    """Constructs the URL of the monthly trip data file.
+    Args:
+        taxi_type (str): The taxi type ('yellow', 'green' or 'fhv').
+        year (int): The year of the trip data.
+        month (int): The month of the trip data.
+        source_format (str): 'parquet' for the TLC endpoint, 'csv' for the DataTalksClub csv.gz mirror.
+    Returns:
+        str: The constructed URL for the trip data file.
+    """
+
+    file_name = f"{taxi_type}_tripdata_{year}-{month:02d}"
+
+    if source_format == 'parquet':
+        return f"{PARQUET_URL}{file_name}.parquet"
+    elif source_format == 'csv':
+        return f"{CSV_URL}{taxi_type}/{file_name}.csv.gz"
+    else:
+        raise ValueError("source_format must be either 'parquet' or 'csv'.")
+
+
+def download_to_cache(url: str, cache_dir: str = SOURCE_CACHE_DIR) -> str:
+    """
+    Stream a remote file into the cache directory, keyed by file name, and return its path.
+
+    A cached file is reused as is. Downloads go to a process-unique temp file that is
+    renamed into place, so the cache only ever holds complete files.
+    """
+    file_path = os.path.join(cache_dir, url.rsplit('/', 1)[-1])
+    if os.path.exists(file_path):
+        logger.info(f"Using cached source {file_path}")
+        return file_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+
+    logger.info(f"Downloading {url} to {file_path}")
+    try:
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    f.write(block)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return file_path
+
+
+def extract_batches(file_path: str, batch_size: int = BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Extract Arrow record batches from a local Parquet or CSV(.gz) file.
+
+    Args:
+        file_path: Local path of the downloaded file
+        batch_size: Number of rows per batch
+
+    Yields:
+        Arrow record batches with the file's own schema
+    """
+    if file_path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(file_path)
+        wanted = {col for _, candidates in TRIPS_RAW_COLUMNS.values() for col in candidates}
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+    else:
+        # Compression is detected from the .gz suffix
+        reader = pacsv.open_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(block_size=DOWNLOAD_CHUNK_BYTES),
+        )
+        yield from reader
+
+
+def transform_batch(batch: pa.RecordBatch, taxi_type: str, start: datetime, end: datetime,
+                    extracted_at: datetime) -> pa.RecordBatch:
+    """Project a source batch onto the trips_raw schema and keep only rows inside [start, end)."""
+
+    num_rows = batch.num_rows
+    arrays = [pa.repeat(pa.scalar(taxi_type, type=pa.string()), num_rows)]
+
+    for name, (dtype, candidates) in TRIPS_RAW_COLUMNS.items():
+        source = next((col for col in candidates if col in batch.schema.names), None)
+        if source is None:
+            arrays.append(pa.nulls(num_rows, type=dtype))
+        else:
+            arrays.append(pc.cast(batch.column(source), dtype, safe=False))
+
+    arrays.append(pa.repeat(pa.scalar(extracted_at, type=pa.timestamp("us")), num_rows))
+
+    projected = pa.RecordBatch.from_arrays(arrays, schema=TRIPS_RAW_SCHEMA)
+
+    pickup = projected.column("pickup_datetime")
+    in_window = pc.and_(
+        pc.greater_equal(pickup, pa.scalar(start, type=pa.timestamp("us"))),
+        pc.less(pickup, pa.scalar(end, type=pa.timestamp("us"))),
+    )
+
+    return projected.filter(in_window)
+
+
+def stream_taxi_type(taxi_type: str, source_format: str, start: datetime, end: datetime,
+                     extracted_at: datetime, cache_dir: str) -> Iterator[pa.RecordBatch]:
+    """Yields transformed batches for every monthly file of a taxi type overlapping the window."""
+
+    for year, month in months_in_window(start, end):
+        url = get_tripdata_url(taxi_type, year, month, source_format)
+        file_path = download_to_cache(url, cache_dir)
+
+        batch_count = 0
+        for batch in extract_batches(file_path):
+            transformed = transform_batch(batch, taxi_type, start, end, extracted_at)
+            if transformed.num_rows:
+                batch_count += 1
+                yield transformed
+        logger.info(f"Streamed {batch_count} batches from {url}")
+
+
+def load_interval(con: duckdb.DuckDBPyConnection, taxi_type: str, reader: pa.RecordBatchReader,
+                  start: datetime, end: datetime) -> int:
+    """
+    Replace the run interval of one taxi type in trips_raw with the streamed batches.
+
+    The Arrow reader is registered with DuckDB and scanned in place, so batches are never
+    converted to pandas or materialized as a whole table.
+    """
+    con.execute("BEGIN TRANSACTION")
+    try:
+        con.execute(
+            f"DELETE FROM {TARGET_TABLE} WHERE taxi_type = ? AND pickup_datetime >= ? AND pickup_datetime < ?",
+            [taxi_type, start, end],
+        )
+        con.register("trips_batches", reader)
+        con.execute(f"INSERT INTO {TARGET_TABLE} SELECT * FROM trips_batches")
+        con.unregister("trips_batches")
+        loaded = con.execute(
+            f"SELECT COUNT(*) FROM {TARGET_TABLE} WHERE taxi_type = ? AND pickup_datetime >= ? AND pickup_datetime < ?",
+            [taxi_type, start, end],
+        ).fetchone()[0]
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+    return loaded
+
+
+def main():
+
+    start, end = get_run_window()
+    pipeline_vars = get_pipeline_vars()
+    taxi_types = pipeline_vars.get("taxi_types", ["yellow"])
+    source_format = pipeline_vars.get("source_format", "parquet")
+    cache_dir = pipeline_vars.get("source_cache_dir") or SOURCE_CACHE_DIR
+    extracted_at = datetime.now()
+
+    logger.info(f"Ingesting {taxi_types} trips for [{start}, {end}) from {source_format} sources")
+
+    con = duckdb.connect(get_duckdb_path())
+    try:
+        con.execute("CREATE SCHEMA IF NOT EXISTS ingestion")
+        con.execute(CREATE_TRIPS_RAW_SQL)
+
+        for taxi_type in taxi_types:
+            batches = stream_taxi_type(taxi_type, source_format, start, end, extracted_at, cache_dir)
+            reader = pa.RecordBatchReader.from_batches(TRIPS_RAW_SCHEMA, batches)
+            loaded = load_interval(con, taxi_type, reader, start, end)
+            logger.info(f"Loaded {loaded} {taxi_type} rows into {TARGET_TABLE}")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+
+    main()
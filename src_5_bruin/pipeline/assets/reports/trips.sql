@@ -7,7 +7,9 @@ depends:
 
 materialization:
   type: table
-  strategy: create+replace
+  strategy: time_interval
+  incremental_key: pickup_date
+  time_granularity: date
 
 columns:
   - name: pickup_date
@@ -27,7 +29,7 @@ columns:
 @bruin */
 
 SELECT
-  CAST(pickup_datetime AS DATE) AS pickup_date,
+  pickup_date,
   COALESCE(payment_type_name, 'unknown') AS payment_type_name,
   COUNT(*) AS trip_count,
   SUM(COALESCE(total_amount, 0)) AS total_amount_sum
@@ -8,9 +8,16 @@ depends:
 
 materialization:
   type: table
-  strategy: create+replace
+  strategy: time_interval
+  incremental_key: pickup_date
+  time_granularity: date
 
 columns:
+  - name: pickup_date
+    type: date
+    nullable: false
+    checks:
+      - name: not_null
   - name: vendor_id
     type: integer
     checks:
@@ -25,6 +32,7 @@ columns:
 @bruin */
 
 SELECT
+  CAST(t.pickup_datetime AS DATE) AS pickup_date,
   t.vendor_id,
   t.pickup_datetime,
   t.dropoff_datetime,